@@ -0,0 +1,108 @@
+"""Resolución adaptativa de los universos con una tolerancia de error.
+
+Los universos de alta precisión (501 puntos por entrada, 1501 de propina) se
+sustituyen por universos no uniformes. Estos se construyen con los puntos de
+ruptura de las funciones de membresía y se refinan en los tramos con pendiente
+(FuzzySystem(spacing=...)). Se empieza con spacing = tolerancia y se divide a la
+mitad hasta que la desviación máxima frente a la referencia densa, sobre una
+rejilla de entradas, no supera la tolerancia. El informe da la desviación
+alcanzada, el número de puntos de cada universo y la aceleración en modo
+escalar y por lotes.
+
+Uso: python adaptive_resolution.py --tolerance 0.05 --method lom --json informe.json
+"""
+import argparse
+import json
+
+import numpy as np
+
+from bench_common import input_grid, time_per_call
+from fuzzy_system import FuzzySystem
+
+
+def fit_spacing(tolerance, method='lom', grid_step=0.05, reference=None, min_spacing=1e-3):
+    """Sistema adaptativo más grueso cuya desviación frente a la referencia no supera tolerance.
+
+    Devuelve (sistema, spacing, desviación máxima). Si refinar deja de reducir
+    la desviación (o se llega a min_spacing) sin alcanzar la tolerancia, se
+    devuelve el mejor intento. Con 'centroid' la referencia da a los singletons
+    un peso que depende de su propio paso, y eso marca un mínimo que ninguna
+    resolución adaptativa elimina.
+    """
+    reference = reference or FuzzySystem()
+    servicio_vals, comida_vals = input_grid(grid_step)
+    reference_tips = reference.compute_batch(servicio_vals, comida_vals, method)
+
+    spacing = tolerance
+    best = None
+    while True:
+        system = FuzzySystem(spacing=spacing)
+        tips = system.compute_batch(servicio_vals, comida_vals, method)
+        deviation = float(np.max(np.abs(tips - reference_tips)))
+        if best is not None and deviation > 0.9 * best[2]:
+            # Refinar ya no mejora: el resto de la desviación no viene de la resolución
+            return best
+        best = (system, spacing, deviation)
+        if deviation <= tolerance or spacing / 2 < min_spacing:
+            return best
+        spacing /= 2
+
+
+def run(args):
+    reference = FuzzySystem(args.input_points, args.output_points)
+    system, spacing, deviation = fit_spacing(args.tolerance, args.method, args.grid_step, reference)
+
+    rng = np.random.default_rng(0)
+    scalar_calls = [(float(s), float(c)) for s, c in rng.uniform(0, 5, (args.scalar_calls, 2))]
+    batch_calls = [input_grid(args.grid_step)]
+
+    timings = {}
+    for name, fuzzy_system in (('reference', reference), ('adaptive', system)):
+        scalar = lambda s, c, f=fuzzy_system: f.defuzzify(f.infer(s, c), args.method)
+        batch = lambda s, c, f=fuzzy_system: f.compute_batch(s, c, args.method)
+        timings[name] = {'scalar_us': time_per_call(scalar, scalar_calls) * 1e6,
+                         'batch_ms': time_per_call(batch, batch_calls) * 1e3}
+
+    return {
+        'tolerance': args.tolerance,
+        'method': args.method,
+        'spacing': spacing,
+        'max_abs_deviation': deviation,
+        'grid_points': int(len(batch_calls[0][0])),
+        'points': {
+            'reference': [len(reference.servicio_universe), len(reference.comida_universe),
+                          len(reference.propina_universe)],
+            'adaptive': [len(system.servicio_universe), len(system.comida_universe), len(system.propina_universe)],
+        },
+        'timings': timings,
+        'speedup_scalar': timings['reference']['scalar_us'] / timings['adaptive']['scalar_us'],
+        'speedup_batch': timings['reference']['batch_ms'] / timings['adaptive']['batch_ms'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Universos adaptativos con tolerancia de error")
+    parser.add_argument('--tolerance', type=float, default=0.05, help="desviación máxima admitida en la propina")
+    parser.add_argument('--method', default='lom', choices=['lom', 'centroid'])
+    parser.add_argument('--grid-step', type=float, default=0.05, help="paso de la rejilla de validación")
+    parser.add_argument('--input-points', type=int, default=501, help="puntos de entrada de la referencia")
+    parser.add_argument('--output-points', type=int, default=1501, help="puntos de propina de la referencia")
+    parser.add_argument('--scalar-calls', type=int, default=500)
+    parser.add_argument('--json', help="ruta del informe JSON")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    print(f"spacing={report['spacing']:.4g} desviación máxima={report['max_abs_deviation']:.4g} "
+          f"(tolerancia {report['tolerance']:.4g}, {report['grid_points']} entradas)")
+    print(f"puntos servicio/comida/propina: {report['points']['reference']} -> {report['points']['adaptive']}")
+    for name, timing in report['timings'].items():
+        print(f"{name:<10} escalar={timing['scalar_us']:8.1f} us lote={timing['batch_ms']:8.2f} ms")
+    print(f"aceleración: escalar x{report['speedup_scalar']:.2f}, lote x{report['speedup_batch']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
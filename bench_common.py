@@ -0,0 +1,22 @@
+"""Utilidades compartidas por los scripts de medición y ajuste."""
+import time
+
+import numpy as np
+
+
+def input_grid(step):
+    """Todos los pares (servicio, comida) de la rejilla 0-5 con el paso dado"""
+    values = np.round(np.arange(0, 5 + step / 2, step), 10)
+    servicio_grid, comida_grid = np.meshgrid(values, values, indexing='ij')
+    return servicio_grid.ravel(), comida_grid.ravel()
+
+
+def time_per_call(fn, calls, repeats=3):
+    """Mejor tiempo medio por llamada (s) entre varias repeticiones"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for args in calls:
+            fn(*args)
+        best = min(best, (time.perf_counter() - start) / len(calls))
+    return best
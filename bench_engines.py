@@ -0,0 +1,216 @@
+"""Comparativa de rendimiento entre el controlador skfuzzy y FuzzySystem.
+
+Recorre la rejilla completa de entradas 0-5 para cada resolución de universo,
+método de defuzzificación y tamaño de lote, y mide latencia p50/p99 por llamada,
+propinas por segundo y pico de memoria (tracemalloc). Cada fila incluye la
+diferencia máxima frente a la referencia del mismo motor y método (modo escalar
+con la primera resolución de la lista), para que una mejora de velocidad no
+oculte un cambio en los resultados. Además se informa de la diferencia máxima
+entre ambos motores; tienen bases de reglas distintas (skfuzzy añade el término
+'inexistente'), así que ese valor sirve para seguir su evolución, no debe ser 0.
+Cada método de skfuzzy se fija en el Consequent; si dos métodos dan la misma
+salida en toda la rejilla, la ejecución falla en lugar de comparar centroides.
+
+El modo escalar de FuzzySystem se mide con cada modo de inferencia
+(--inference-modes: 'sparse', 'dense', 'fused'); la referencia es el primero, así
+que la diferencia de los demás comprueba que dan el mismo resultado.
+
+Se comparan las salidas directas de cada motor, sin el caso especial [0,0].
+
+Uso: python bench_engines.py --grid-step 0.25 --json resultados.json
+"""
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+from bench_common import input_grid
+from fuzzy_system import FuzzySystem
+from tip_controller import SimulationPool, build_control_system
+
+FUZZY_SAMPLED_METHODS = ('centroid', 'lom')
+FUZZY_EXACT_METHODS = ('centroid', 'lom', 'som', 'mom')
+SKFUZZY_METHODS = ('centroid', 'bisector', 'mom', 'som', 'lom')
+MEMORY_CALLS = 10
+
+
+def split(servicio_vals, comida_vals, batch_size):
+    """Argumentos de cada llamada: escalares si batch_size es None, arrays si no"""
+    if batch_size is None:
+        return [(float(s), float(c)) for s, c in zip(servicio_vals, comida_vals)]
+    return [(servicio_vals[i:i + batch_size], comida_vals[i:i + batch_size])
+            for i in range(0, len(servicio_vals), batch_size)]
+
+
+def measure(fn, calls):
+    """Latencias por llamada, salidas concatenadas y pico de memoria en bytes"""
+    fn(*calls[0])  # calentamiento
+    latencies = np.empty(len(calls))
+    outputs = []
+    for i, args in enumerate(calls):
+        start = time.perf_counter()
+        outputs.append(fn(*args))
+        latencies[i] = time.perf_counter() - start
+
+    # El pico de memoria se mide aparte para no distorsionar las latencias
+    tracemalloc.start()
+    for args in calls[:MEMORY_CALLS]:
+        fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return latencies, np.concatenate([np.atleast_1d(out) for out in outputs]).astype(float), peak
+
+
+def fuzzy_cases(input_points, output_points, methods, batch_sizes, inference_modes):
+    """(modo, método, tamaño de lote, función) para FuzzySystem"""
+    systems = {}
+    for inference_mode in inference_modes:
+        systems[inference_mode] = FuzzySystem(input_points, output_points)
+        systems[inference_mode].inference_mode = inference_mode
+    fuzzy_system = systems[inference_modes[0]]
+
+    for method in methods:
+        if method in FUZZY_SAMPLED_METHODS:
+            for inference_mode, system in systems.items():
+                yield f'scalar:{inference_mode}', method, None, \
+                    lambda s, c, m=method, f=system: f.defuzzify(f.infer(s, c), m)
+            for batch_size in batch_sizes:
+                yield 'batch', method, batch_size, \
+                    lambda s, c, m=method, b=batch_size: fuzzy_system.compute_batch(s, c, m, chunk_size=b)
+        if method in FUZZY_EXACT_METHODS:
+            yield 'exact', method, None, lambda s, c, m=method: fuzzy_system.compute_exact(s, c, m)
+
+
+def skfuzzy_cases(input_points, output_points, methods, batch_sizes):
+    """(modo, método, tamaño de lote, función) para el controlador skfuzzy"""
+    for method in methods:
+        if method not in SKFUZZY_METHODS:
+            continue
+        # skfuzzy toma el método del Consequent de cada sistema
+        factory = lambda m=method: build_control_system(input_points, output_points, m)
+        pool = SimulationPool(factory, size=1, defuzz_method=method)
+        # Sin caché: cada punto de la rejilla se calcula de verdad
+        with pool.simulation() as simulacion:
+            simulacion.cache = False
+        yield 'scalar', method, None, pool.compute
+
+        array_pool = SimulationPool(factory, size=1, defuzz_method=method)
+        for batch_size in batch_sizes:
+            yield 'batch', method, batch_size, lambda s, c, p=array_pool: compute_array(p, s, c)
+
+
+def compute_array(pool, servicio_vals, comida_vals):
+    with pool.simulation() as simulacion, warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message="Input array is shape")
+        simulacion.input['servicio'] = servicio_vals
+        simulacion.input['comida'] = comida_vals
+        simulacion.compute()
+        return simulacion.output['propina']
+
+
+def check_skfuzzy_methods(references):
+    """Falla si dos métodos de skfuzzy dan la misma salida en toda la rejilla.
+
+    Es la señal de que el método no llega al Consequent y todos son el
+    centroide, así que la comparación por método entre motores no valdría.
+    """
+    skfuzzy = [(method, outputs) for (engine, method), outputs in references.items() if engine == 'skfuzzy']
+    for i, (method_a, outputs_a) in enumerate(skfuzzy):
+        for method_b, outputs_b in skfuzzy[i + 1:]:
+            if np.array_equal(outputs_a, outputs_b):
+                raise RuntimeError(f"skfuzzy da la misma salida con '{method_a}' y '{method_b}': "
+                                   "el método de defuzzificación no se está aplicando")
+
+
+def run(args):
+    servicio_vals, comida_vals = input_grid(args.grid_step)
+    resolutions = [tuple(int(v) for v in item.split(':')) for item in args.resolutions.split(',')]
+    methods = args.methods.split(',')
+    batch_sizes = [int(v) for v in args.batch_sizes.split(',')]
+    inference_modes = args.inference_modes.split(',')
+
+    results = []
+    references = {}
+    for input_points, output_points in resolutions:
+        engines = [('fuzzy', fuzzy_cases(input_points, output_points, methods, batch_sizes, inference_modes))]
+        if not args.skip_skfuzzy:
+            engines.append(('skfuzzy', skfuzzy_cases(input_points, output_points, methods, batch_sizes)))
+
+        for engine, cases in engines:
+            for mode, method, batch_size, fn in cases:
+                calls = split(servicio_vals, comida_vals, batch_size)
+                latencies, outputs, peak = measure(fn, calls)
+                references.setdefault((engine, method), outputs)
+                results.append({
+                    'engine': engine,
+                    'mode': mode,
+                    'method': method,
+                    'input_points': input_points,
+                    'output_points': output_points,
+                    'batch_size': batch_size or 1,
+                    'calls': len(calls),
+                    'p50_ms': float(np.percentile(latencies, 50) * 1000),
+                    'p99_ms': float(np.percentile(latencies, 99) * 1000),
+                    'throughput_per_s': float(len(outputs) / latencies.sum()),
+                    'peak_kb': peak / 1024,
+                    'max_abs_diff_vs_reference': float(np.max(np.abs(outputs - references[(engine, method)]))),
+                })
+                if not args.json_only:
+                    row = results[-1]
+                    print(f"{engine:<8} {mode:<13} {method:<9} {input_points:>5}:{output_points:<5} "
+                          f"lote={row['batch_size']:<5} p50={row['p50_ms']:8.3f} ms p99={row['p99_ms']:8.3f} ms "
+                          f"{row['throughput_per_s']:10.1f}/s pico={row['peak_kb']:9.1f} KiB "
+                          f"dif={row['max_abs_diff_vs_reference']:.4g}")
+
+    check_skfuzzy_methods(references)
+
+    engine_diff = {method: float(np.max(np.abs(references[('fuzzy', method)] - references[('skfuzzy', method)])))
+                   for method in methods
+                   if ('fuzzy', method) in references and ('skfuzzy', method) in references}
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'grid_step': args.grid_step,
+            'grid_points': int(len(servicio_vals)),
+            'reference_resolution': list(resolutions[0]),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+        'engine_max_abs_diff': engine_diff,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparativa skfuzzy vs FuzzySystem")
+    parser.add_argument('--grid-step', type=float, default=0.5, help="paso de la rejilla de entradas 0-5")
+    parser.add_argument('--resolutions', default='501:1501,101:301',
+                        help="puntos entrada:salida separados por comas; la primera es la referencia")
+    parser.add_argument('--methods', default='centroid,lom')
+    parser.add_argument('--batch-sizes', default='64,1024')
+    parser.add_argument('--inference-modes', default='sparse,dense,fused',
+                        help="modos de inferencia escalar de FuzzySystem; el primero es la referencia")
+    parser.add_argument('--skip-skfuzzy', action='store_true', help="solo FuzzySystem (skfuzzy es lento)")
+    parser.add_argument('--json', help="ruta del informe JSON")
+    parser.add_argument('--json-only', action='store_true', help="no imprimir la tabla")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.json_only and not args.json:
+        print(json.dumps(report, indent=2))
+    elif not args.json_only:
+        for method, diff in report['engine_max_abs_diff'].items():
+            print(f"diferencia máxima fuzzy vs skfuzzy ({method}): {diff:.4g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Tiempo de importación en frío de los módulos del motor y de la interfaz.
+
+Cada medida se hace en un proceso nuevo. Para cada módulo se mide la importación
+sola y la importación más el primer uso (construcción del sistema), y se indica
+si la importación cargó tkinter, matplotlib, PIL o skfuzzy.
+
+Uso: python bench_import.py --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ('tkinter', 'matplotlib', 'PIL', 'skfuzzy')
+
+CASES = [
+    ('fuzzy_system', 'import fuzzy_system', 'fuzzy_system.FuzzySystem()'),
+    ('tip_controller', 'import tip_controller', 'tip_controller.compute_tip(3, 4)'),
+    ('prueba', 'import prueba', None),
+    ('proyectoLD', 'import proyectoLD', None),
+]
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{statement}
+imported = time.perf_counter() - start
+loaded = [name for name in {heavy!r} if name in sys.modules]
+{first_use}
+used = time.perf_counter() - start
+print(json.dumps({{'import_s': imported, 'first_use_s': used, 'loaded': loaded}}))
+"""
+
+
+def measure(statement, first_use):
+    code = PROBE.format(statement=statement, heavy=HEAVY_MODULES, first_use=first_use or 'pass')
+    env = dict(os.environ, MPLBACKEND='Agg')
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de importación de los módulos")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help="salida en JSON")
+    args = parser.parse_args()
+
+    report = {}
+    for name, statement, first_use in CASES:
+        runs = [measure(statement, first_use) for _ in range(args.repeat)]
+        report[name] = {
+            'import_ms': statistics.median(run['import_s'] for run in runs) * 1000,
+            'first_use_ms': statistics.median(run['first_use_s'] for run in runs) * 1000 if first_use else None,
+            'loaded': runs[0]['loaded'],
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'módulo':<16} {'import (ms)':>12} {'+ primer uso (ms)':>18}  cargados")
+    for name, row in report.items():
+        first_use = f"{row['first_use_ms']:.1f}" if row['first_use_ms'] is not None else '-'
+        print(f"{name:<16} {row['import_ms']:>12.1f} {first_use:>18}  {', '.join(row['loaded']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Rendimiento de compute_tip con la reserva de simulaciones de 1 a N hilos.
+
+Uso: python bench_threads.py --max-threads 8 --requests 400
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import tip_controller
+
+
+def run(threads, servicio_vals, comida_vals):
+    """Propinas por segundo repartiendo las peticiones entre threads hilos"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(tip_controller.compute_tip, servicio_vals, comida_vals))
+    return len(servicio_vals) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escalado de compute_tip con el número de hilos")
+    parser.add_argument('--max-threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    # Entradas nuevas en cada ronda para que la caché interna de skfuzzy no acierte
+    rng = np.random.default_rng(args.seed)
+
+    tip_controller.simulation_pool.size = args.max_threads
+    run(args.max_threads, rng.uniform(0, 5, args.max_threads), rng.uniform(0, 5, args.max_threads))  # calentamiento
+
+    baseline = None
+    print(f"{'hilos':>6} {'propinas/s':>12} {'escalado':>9}")
+    threads = 1
+    while threads <= args.max_threads:
+        throughput = run(threads, rng.uniform(0, 5, args.requests), rng.uniform(0, 5, args.requests))
+        baseline = baseline or throughput
+        print(f"{threads:>6} {throughput:>12.1f} {throughput / baseline:>8.2f}x")
+        threads *= 2
+
+
+if __name__ == "__main__":
+    main()
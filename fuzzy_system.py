@@ -0,0 +1,698 @@
+import threading
+import numpy as np
+import membership
+from lookup_table import TipLookupTable
+from tip_cache import TipCache
+
+# Categorías de propina: la primera cuyo umbral se supera (enfoque con lista para evitar if-elif anidados)
+TIP_CATEGORIES = [
+    (15, "Muy alta"),
+    (14, "Alta"),
+    (12, "Media"),
+    (8, "Baja"),
+    (1, "Muy baja"),
+    (0, "Ninguna")
+]
+
+# Métodos de defuzzificación de compute/compute_batch: los muestreados usan la salida
+# agregada sobre el universo de propina y los exactos, la forma cerrada a partir de
+# las fuerzas por término (defuzzify_exact) con el método indicado
+SAMPLED_METHODS = ('centroid', 'lom')
+EXACT_METHODS = {'exact_centroid': 'centroid', 'exact_lom': 'lom', 'som': 'som', 'mom': 'mom'}
+DEFUZZ_METHODS = SAMPLED_METHODS + tuple(EXACT_METHODS)
+
+# Activación compacta de una regla: índice en self.rules y fuerza de disparo
+RULE_ACTIVATION_DTYPE = np.dtype([('rule', np.int32), ('strength', np.float64)])
+
+def get_tip_category(value, categories=TIP_CATEGORIES):
+    """Categoría de una propina nítida"""
+    for threshold, category in categories:
+        if value > threshold:
+            return category
+    return "Ninguna"
+
+def get_tip_categories(values, categories=TIP_CATEGORIES):
+    """Categorías de un array de propinas (versión vectorizada de get_tip_category)"""
+    values = np.asarray(values)
+    return np.select([values > threshold for threshold, _ in categories],
+                     [category for _, category in categories], default="Ninguna")
+
+class FuzzyTerm:
+    """Término de una variable: su función es una fila de la matriz de la variable"""
+    __slots__ = ('variable', 'index', 'name')
+
+    def __init__(self, variable, index, name):
+        self.variable = variable
+        self.index = index
+        self.name = name
+
+    @property
+    def mf(self):
+        return self.variable.matrix[self.index]
+
+class FuzzyVariable:
+    """Variable difusa: universo y funciones de todos sus términos en una matriz contigua (términos x universo)"""
+    __slots__ = ('name', 'universe', 'matrix', 'terms')
+
+    def __init__(self, name, universe, term_names, matrix):
+        self.name = name
+        self.universe = universe
+        self.matrix = matrix
+        self.terms = {term: FuzzyTerm(self, i, term) for i, term in enumerate(term_names)}
+
+    def __getitem__(self, term):
+        return self.terms[term]
+
+    def term_arrays(self):
+        """{término: función} con cada función como vista de su fila"""
+        return {term: self.matrix[i] for i, term in enumerate(self.terms)}
+
+class FuzzySystem:
+    def __init__(self, input_points=501, output_points=1501, spacing=None, compact=False):
+        # Definición de los universos de discurso
+        self.servicio_universe = np.linspace(0, 5, input_points)
+        self.comida_universe = np.linspace(0, 5, input_points)
+        self.propina_universe = np.linspace(0, 15, output_points)
+        
+        # Definición paramétrica de los términos: (tipo de función, parámetros)
+        self.servicio_shapes = {
+            'mediocre': ('trapmf', [0, 0, 1, 1.5]),
+            'mala': ('trimf', [0.5, 1.5, 2.5]),
+            'regular': ('trimf', [1.5, 2.5, 3.5]),
+            'bueno': ('trimf', [2.5, 3.5, 4.5]),
+            'excelente': ('trapmf', [3.5, 4.5, 5, 5])
+        }
+        
+        self.comida_shapes = {
+            'mediocre': ('trapmf', [0, 0, 1, 1.5]),
+            'mala': ('trimf', [0.5, 1.5, 2.5]),
+            'regular': ('trimf', [1.5, 2.5, 3.5]),
+            'bueno': ('trimf', [2.5, 3.5, 4.5]),
+            'excelente': ('trapmf', [3.5, 4.5, 5, 5])
+        }
+        
+        self.propina_shapes = {
+            'cero': ('singletonmf', 0),
+            'muybaja': ('trapmf', [0, 0, 2, 4]),
+            'baja': ('trapmf', [2, 4, 6, 8]),
+            'media': ('trapmf', [6, 8, 10, 12]),
+            'alta': ('trapmf', [10, 12, 14, 14.99]),
+            'muyalta': ('singletonmf', 15)
+        }
+        
+        # Resolución adaptativa: universos no uniformes a partir de los puntos de ruptura
+        if spacing is not None:
+            self.servicio_universe = self.adaptive_universe(self.servicio_shapes, 0, 5, spacing)
+            self.comida_universe = self.adaptive_universe(self.comida_shapes, 0, 5, spacing)
+            self.propina_universe = self.adaptive_universe(self.propina_shapes, 0, 15, spacing)
+        
+        # Caché de propinas (se vacía al cambiar funciones de membresía o reglas)
+        self.cache = TipCache()
+        
+        # 'sparse': solo reglas activas; 'dense': todas las reglas;
+        # 'fused': un solo recorte de la matriz de consecuentes
+        self.inference_mode = 'sparse'
+        
+        # Modo compacto: funciones de membresía guardadas en float32 y buffers de salida
+        # reutilizados. Fuerzas, recortes y agregado siguen en float64: en float32 se
+        # confunden fuerzas casi empatadas y 'lom' cambia de término. Aun así no es
+        # idéntico a float64: el redondeo de las pendientes de propina mueve el borde
+        # del máximo, así que 'lom' puede diferir en un paso del universo de propina
+        # (0.01) y el centroide en menos de 1e-8.
+        self.compact = compact
+        self.dtype = np.float32 if compact else np.float64
+        self._local = threading.local()
+        
+        # Funciones de membresía y reglas del sistema (compiladas en arrays de índices)
+        self.rebuild_membership()
+        self.compile_rules(self.create_rules())
+    
+    def rebuild_membership(self):
+        """Construye las funciones de membresía a partir de servicio/comida/propina_shapes.
+
+        Debe llamarse tras modificar cualquier *_shapes; recompila las reglas y
+        vacía la caché.
+        """
+        # Funciones de membresía muestreadas sobre cada universo, una matriz por variable
+        # (todos los términos de una variable en una sola pasada)
+        self.servicio = FuzzyVariable('servicio', self.servicio_universe, list(self.servicio_shapes),
+                                      membership.evaluate(self.servicio_universe, self.servicio_shapes, self.dtype))
+        self.comida = FuzzyVariable('comida', self.comida_universe, list(self.comida_shapes),
+                                    membership.evaluate(self.comida_universe, self.comida_shapes, self.dtype))
+        self.propina = FuzzyVariable('propina', self.propina_universe, list(self.propina_shapes),
+                                     membership.evaluate(self.propina_universe, self.propina_shapes, self.dtype))
+        self.servicio_terms = self.servicio.term_arrays()
+        self.comida_terms = self.comida.term_arrays()
+        self.propina_terms = self.propina.term_arrays()
+        
+        self.build_params()
+        
+        # La matriz de consecuentes depende de las funciones de propina
+        if hasattr(self, 'rules'):
+            self.compile_rules(self.rules)
+        self.cache.invalidate()
+    
+    def build_params(self):
+        """Parámetros (a, b, c, d) de cada término para la fuzzificación analítica"""
+        self.servicio_params = self.trapezoid_params(self.servicio_shapes)
+        self.comida_params = self.trapezoid_params(self.comida_shapes)
+        self.propina_params = self.trapezoid_params(self.propina_shapes)
+        self.servicio_coeffs = membership.trapezoid_coeffs(self.servicio_params)
+        self.comida_coeffs = membership.trapezoid_coeffs(self.comida_params)
+        self.propina_coeffs = membership.trapezoid_coeffs(self.propina_params)
+        
+        self.propina_weights = self.universe_weights(self.propina_universe)
+    
+    @staticmethod
+    def universe_weights(universe):
+        """Pesos del centroide si el universo no es uniforme (regla del trapecio); None si lo es"""
+        steps = np.diff(universe)
+        if np.allclose(steps, steps[0]):
+            return None
+        return (np.r_[0, steps] + np.r_[steps, 0]) / 2
+    
+    # Funciones de membresía de un término (ver membership.py)
+    trimf = staticmethod(membership.trimf)
+    trapmf = staticmethod(membership.trapmf)
+    singletonmf = staticmethod(membership.singletonmf)
+    
+    @staticmethod
+    def trapezoid_params(shapes):
+        """Expresa cada término como trapecio (a, b, c, d): una fila por término"""
+        return membership.trapezoid_params(shapes)
+    
+    @classmethod
+    def adaptive_universe(cls, shapes, lo, hi, spacing):
+        """Universo no uniforme: puntos de ruptura de los términos más puntos cada
+        spacing como máximo en los tramos con pendiente (los tramos planos son exactos)"""
+        points = [np.array([lo, hi], dtype=float)]
+        for a, b, c, d in cls.trapezoid_params(shapes):
+            points.append(np.array([a, b, c, d]))
+            for start, stop in ((a, b), (c, d)):
+                if stop > start:
+                    points.append(np.linspace(start, stop, int(np.ceil((stop - start) / spacing)) + 1))
+        points = np.concatenate(points)
+        return np.unique(points[(lo <= points) & (points <= hi)])
+    
+    def create_rules(self):
+        """Crea las reglas del sistema difuso"""
+        rules = []
+        
+        # Mapeo de categorías a índices para acceder a las funciones de membresía
+        categories = ['mediocre', 'mala', 'regular', 'bueno', 'excelente']
+        tip_categories = ['muybaja', 'baja', 'media', 'alta', 'muyalta']
+        
+        # Matriz de reglas (servicio x comida -> propina)
+        rule_matrix = [
+            # Mediocre  Mala    Regular Bueno   Excelente
+            ['muybaja', 'muybaja', 'muybaja', 'muybaja', 'baja'],     # Mediocre
+            ['muybaja', 'muybaja', 'muybaja', 'baja', 'media'],      # Mala
+            ['muybaja', 'muybaja', 'baja', 'media', 'alta'],        # Regular
+            ['muybaja', 'baja', 'media', 'alta', 'muyalta'],        # Bueno
+            ['baja', 'media', 'alta', 'muyalta', 'muyalta']         # Excelente
+        ]
+        
+        # Convertir matriz en lista de reglas
+        for i, servicio_cat in enumerate(categories):
+            for j, comida_cat in enumerate(categories):
+                propina_cat = rule_matrix[i][j]
+                rules.append({
+                    'servicio': servicio_cat,
+                    'comida': comida_cat,
+                    'propina': propina_cat
+                })
+        
+        # Regla especial para 0,0
+        rules.append({
+            'servicio': 'mediocre',
+            'comida': 'mediocre',
+            'propina': 'cero'
+        })
+        
+        return rules
+    
+    def compile_rules(self, rules):
+        """Compila la lista de reglas en arrays de índices enteros.
+
+        Puede llamarse en cualquier momento para cambiar la tabla de reglas sin
+        reconstruir las funciones de membresía.
+        """
+        self.servicio_names = list(self.servicio_terms)
+        self.comida_names = list(self.comida_terms)
+        self.propina_names = list(self.propina_terms)
+
+        # Antecedentes (índice de término de servicio y de comida) -> consecuente
+        self.rule_servicio = np.array([self.servicio_names.index(rule['servicio']) for rule in rules], dtype=int)
+        self.rule_comida = np.array([self.comida_names.index(rule['comida']) for rule in rules], dtype=int)
+        self.rule_propina = np.array([self.propina_names.index(rule['propina']) for rule in rules], dtype=int)
+
+        # Funciones de membresía de propina apiladas (términos x universo)
+        self.propina_matrix = self.propina.matrix
+
+        self.group_rules()
+        self.rules = rules
+        self.cache.invalidate()
+
+    def group_rules(self):
+        """Reglas agrupadas por término de consecuencia y por par de antecedentes"""
+        self.rule_groups = [(k, np.flatnonzero(self.rule_propina == k))
+                            for k in range(len(self.propina_names))
+                            if np.any(self.rule_propina == k)]
+
+        # Consecuente de cada regla como máscara (términos de propina x reglas)
+        self.consequent_mask = self.rule_propina == np.arange(len(self.propina_names))[:, np.newaxis]
+
+        # Índice de activación: (término de servicio, término de comida) -> (regla, consecuente)
+        self.rule_lookup = [[[] for _ in self.comida_names] for _ in self.servicio_names]
+        for rule, (i, j, k) in enumerate(zip(self.rule_servicio, self.rule_comida, self.rule_propina)):
+            self.rule_lookup[i][j].append((rule, k))
+
+    def model_arrays(self):
+        """Arrays del modelo ya construido: universos, funciones apiladas y reglas compiladas"""
+        return {
+            'servicio_universe': self.servicio_universe,
+            'comida_universe': self.comida_universe,
+            'propina_universe': self.propina_universe,
+            'servicio_matrix': self.servicio.matrix,
+            'comida_matrix': self.comida.matrix,
+            'propina_matrix': self.propina_matrix,
+            'rule_servicio': self.rule_servicio,
+            'rule_comida': self.rule_comida,
+            'rule_propina': self.rule_propina,
+        }
+
+    def model_metadata(self):
+        """Parte pequeña del modelo: definición paramétrica de los términos"""
+        return {
+            'servicio_shapes': self.servicio_shapes,
+            'comida_shapes': self.comida_shapes,
+            'propina_shapes': self.propina_shapes,
+        }
+
+    @classmethod
+    def from_model(cls, arrays, metadata):
+        """Reconstruye un FuzzySystem sobre arrays ya calculados, sin copiarlos ni volver a muestrear"""
+        system = cls.__new__(cls)
+        system.cache = TipCache()
+        system.inference_mode = 'sparse'
+        system.dtype = arrays['propina_matrix'].dtype.type
+        system.compact = system.dtype == np.float32
+        system._local = threading.local()
+        system.servicio_universe = arrays['servicio_universe']
+        system.comida_universe = arrays['comida_universe']
+        system.propina_universe = arrays['propina_universe']
+        system.servicio_shapes = metadata['servicio_shapes']
+        system.comida_shapes = metadata['comida_shapes']
+        system.propina_shapes = metadata['propina_shapes']
+        system.servicio_names = list(system.servicio_shapes)
+        system.comida_names = list(system.comida_shapes)
+        system.propina_names = list(system.propina_shapes)
+
+        # Cada término es una fila (vista) de la matriz apilada
+        system.servicio = FuzzyVariable('servicio', system.servicio_universe, system.servicio_names,
+                                        arrays['servicio_matrix'])
+        system.comida = FuzzyVariable('comida', system.comida_universe, system.comida_names, arrays['comida_matrix'])
+        system.propina = FuzzyVariable('propina', system.propina_universe, system.propina_names,
+                                       arrays['propina_matrix'])
+        system.servicio_terms = system.servicio.term_arrays()
+        system.comida_terms = system.comida.term_arrays()
+        system.propina_terms = system.propina.term_arrays()
+        system.propina_matrix = system.propina.matrix
+        system.build_params()
+
+        system.rule_servicio = arrays['rule_servicio']
+        system.rule_comida = arrays['rule_comida']
+        system.rule_propina = arrays['rule_propina']
+        system.group_rules()
+        system.rules = [{'servicio': system.servicio_names[i],
+                         'comida': system.comida_names[j],
+                         'propina': system.propina_names[k]}
+                        for i, j, k in zip(system.rule_servicio, system.rule_comida, system.rule_propina)]
+        return system
+
+    def fuzzify(self, value, terms, universe):
+        """Fuzzificación: calcula el grado de membresía para cada término"""
+        membership = {}
+        for term, mf in terms.items():
+            membership[term] = np.interp(value, universe, mf)
+        return membership
+
+    @staticmethod
+    def fuzzify_array(value, coeffs, universe):
+        """Fuzzificación analítica: grados de cada término (filas) con membership.trapezoid_coeffs.
+
+        No depende de la resolución del universo; la entrada se limita a sus
+        extremos igual que haría np.interp sobre las funciones muestreadas.
+        """
+        x = np.clip(np.asarray(value, dtype=float), universe[0], universe[-1])
+        degrees = membership.trapezoids_from_coeffs(x.reshape(-1), coeffs)
+        return degrees.reshape((len(coeffs[0]),) + x.shape)
+
+    def firing_strengths(self, servicio_val, comida_val):
+        """Fuerza de activación de cada regla (operador AND = mínimo)"""
+        servicio_degrees = self.fuzzify_array(servicio_val, self.servicio_coeffs, self.servicio_universe)
+        comida_degrees = self.fuzzify_array(comida_val, self.comida_coeffs, self.comida_universe)
+        return np.minimum(servicio_degrees[self.rule_servicio], comida_degrees[self.rule_comida])
+
+    def infer(self, servicio_val, comida_val, explain=False):
+        """Inferencia difusa: aplica las reglas y calcula la salida agregada.
+
+        Con explain=True devuelve (agregado, activaciones): un array compacto
+        (RULE_ACTIVATION_DTYPE) con las reglas activas de mayor a menor fuerza.
+        El consecuente recortado de cada regla no se guarda; rule_output() lo
+        calcula solo para las reglas que se vayan a mostrar.
+
+        En modo compacto el agregado es un buffer del hilo que la
+        siguiente inferencia del mismo hilo sobrescribe; hay que copiarlo para
+        conservarlo.
+        """
+        activations = [] if explain else None
+        if self.inference_mode == 'sparse':
+            aggregated = self.infer_sparse(servicio_val, comida_val, activations)
+        elif self.inference_mode == 'fused':
+            aggregated = self.infer_fused(servicio_val, comida_val, activations)
+        else:
+            aggregated = self.infer_dense(servicio_val, comida_val, activations)
+        if not explain:
+            return aggregated
+        
+        activations = np.array(activations, dtype=RULE_ACTIVATION_DTYPE)
+        return aggregated, activations[np.argsort(-activations['strength'], kind='stable')]
+    
+    def infer_dense(self, servicio_val, comida_val, activations=None):
+        """Inferencia evaluando todas las reglas"""
+        # Paso 1: Fuzzificación y activación de todas las reglas a la vez
+        firing = self.firing_strengths(servicio_val, comida_val)
+        if activations is not None:
+            active = np.flatnonzero(firing)
+            activations.extend(zip(active, firing[active]))
+        
+        # Paso 2: Recortar cada consecuencia y agregar (un max-reduce por grupo)
+        if self.compact:
+            aggregated = self._inference_buffers()[0]
+            aggregated.fill(0)
+        else:
+            aggregated = np.zeros(len(self.propina_universe))
+        for k, group in self.rule_groups:
+            clipped = np.minimum(firing[group, np.newaxis], self.propina_matrix[k]).max(axis=0)
+            np.maximum(aggregated, clipped, out=aggregated)
+        
+        return aggregated
+    
+    def infer_sparse(self, servicio_val, comida_val, activations=None):
+        """Inferencia evaluando solo las reglas cuyos antecedentes se activan.
+
+        Con particiones solapadas cada entrada activa como mucho dos términos por
+        variable, así que solo se recortan unas pocas consecuencias; las reglas
+        con fuerza cero no tocan el universo de salida.
+        """
+        servicio_degrees = self.fuzzify_array(servicio_val, self.servicio_coeffs, self.servicio_universe)
+        comida_degrees = self.fuzzify_array(comida_val, self.comida_coeffs, self.comida_universe)
+        active_comida = np.flatnonzero(comida_degrees)
+        
+        if self.compact:
+            aggregated, clipped, _ = self._inference_buffers()
+            aggregated.fill(0)
+        else:
+            aggregated = np.zeros(len(self.propina_universe))
+            clipped = None
+        for i in np.flatnonzero(servicio_degrees):
+            for j in active_comida:
+                firing_strength = min(servicio_degrees[i], comida_degrees[j])
+                for rule, k in self.rule_lookup[i][j]:
+                    if activations is not None:
+                        activations.append((rule, firing_strength))
+                    np.maximum(aggregated, np.minimum(firing_strength, self.propina_matrix[k], out=clipped),
+                               out=aggregated)
+        
+        return aggregated
+    
+    def infer_fused(self, servicio_val, comida_val, activations=None):
+        """Inferencia fusionada: fuerza máxima por consecuente y un único recorte de la
+        matriz (consecuentes x universo) seguido de un solo max-reduce.
+
+        Equivale exactamente a recortar regla a regla, porque
+        max(min(w1, f), min(w2, f)) = min(max(w1, w2), f).
+        """
+        firing = self.firing_strengths(servicio_val, comida_val)
+        if activations is not None:
+            active = np.flatnonzero(firing)
+            activations.extend(zip(active, firing[active]))
+        
+        # Fuerza máxima de las reglas de cada consecuente (columna términos x 1)
+        strengths = np.max(np.where(self.consequent_mask, firing, 0.0), axis=1)
+        if self.compact:
+            aggregated, _, clipped = self._inference_buffers()
+            np.minimum(strengths[:, np.newaxis], self.propina_matrix, out=clipped)
+            return clipped.max(axis=0, out=aggregated)
+        return np.minimum(strengths[:, np.newaxis], self.propina_matrix).max(axis=0)
+    
+    def _inference_buffers(self):
+        """Buffers float64 (agregado, recorte, matriz recortada) reutilizados por el hilo actual en modo compacto"""
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None or buffers[2].shape != self.propina_matrix.shape:
+            size = len(self.propina_universe)
+            buffers = self._local.buffers = (np.empty(size), np.empty(size), np.empty(self.propina_matrix.shape))
+        return buffers
+    
+    def rule_output(self, rule, strength):
+        """Consecuente recortado de una regla (se materializa solo al mostrarlo)"""
+        return np.minimum(strength, self.propina_matrix[self.rule_propina[rule]])
+    
+    def describe_rule(self, rule):
+        """Texto de una regla: 'servicio + comida → propina'"""
+        return "{servicio} + {comida} → {propina}".format(**self.rules[rule])
+    
+    def activation_strengths(self, activations):
+        """Fuerza por término de propina a partir de las activaciones de infer(explain=True)"""
+        strengths = np.zeros(len(self.propina_names))
+        np.maximum.at(strengths, self.rule_propina[activations['rule']], activations['strength'])
+        return strengths
+    
+    def defuzzify(self, aggregated_output, method='centroid'):
+        """Defuzzificación: calcula un valor nítido a partir de la salida difusa"""
+        if method == 'centroid':
+            # Método del centroide
+            if self.propina_weights is not None:
+                aggregated_output = aggregated_output * self.propina_weights
+            if np.sum(aggregated_output) == 0:
+                return 0
+            return np.sum(self.propina_universe * aggregated_output) / np.sum(aggregated_output)
+        elif method == 'lom':
+            # Last of Maximum
+            max_val = np.max(aggregated_output)
+            max_indices = np.where(aggregated_output == max_val)[0]
+            return self.propina_universe[max_indices[-1]]
+        else:
+            raise ValueError(f"Método de defuzzificación no soportado: {method} (los exactos se piden a compute/compute_batch)")
+
+    def consequent_strengths(self, servicio_val, comida_val):
+        """Fuerza máxima de las reglas que concluyen cada término de propina"""
+        firing = self.firing_strengths(servicio_val, comida_val)
+        strengths = np.zeros(len(self.propina_names))
+        for k, group in self.rule_groups:
+            strengths[k] = firing[group].max()
+        return strengths
+
+    def defuzzify_exact(self, strengths, method='centroid'):
+        """Defuzzificación exacta a partir de los trapecios de propina recortados.
+
+        strengths son las fuerzas por término de propina (consequent_strengths).
+        La salida agregada es lineal a trozos, así que basta evaluarla en sus
+        puntos de ruptura sin muestrear el universo. Métodos: 'centroid', 'lom',
+        'som' y 'mom'. Los singletons no tienen área: en el centroide solo cuentan
+        cuando no se activa ningún otro término.
+        """
+        strengths = np.asarray(strengths, dtype=float)
+        lo, hi = self.propina_universe[0], self.propina_universe[-1]
+        a, b, c, d = self.propina_params.T
+        height = strengths.max()
+
+        if method in ('lom', 'som', 'mom'):
+            if height == 0:
+                # Salida nula: todo el universo es máximo
+                return {'lom': hi, 'som': lo, 'mom': (lo + hi) / 2}[method]
+            top = strengths == height
+            left = a[top] + height * (b[top] - a[top])
+            right = d[top] - height * (d[top] - c[top])
+            if method == 'lom':
+                return right.max()
+            elif method == 'som':
+                return left.min()
+            return self._interval_union_mean(left, right)
+        elif method == 'centroid':
+            if height == 0:
+                return 0
+            active = strengths > 0
+            continuous = active & (d > a)
+            if not continuous.any():
+                return np.sum(strengths[active] * a[active]) / np.sum(strengths[active])
+
+            # Rectas de los lados de cada trapecio activo (y = m*x + q) y niveles de recorte
+            rising = continuous & (b > a)
+            falling = continuous & (d > c)
+            slopes = np.concatenate([1 / (b[rising] - a[rising]), -1 / (d[falling] - c[falling]),
+                                     np.zeros(continuous.sum())])
+            offsets = np.concatenate([-a[rising] / (b[rising] - a[rising]), d[falling] / (d[falling] - c[falling]),
+                                      strengths[continuous]])
+
+            # Puntos de ruptura: vértices y cortes entre todas las rectas
+            i, j = np.triu_indices(len(slopes), k=1)
+            crossing = slopes[i] != slopes[j]
+            cuts = (offsets[j[crossing]] - offsets[i[crossing]]) / (slopes[i[crossing]] - slopes[j[crossing]])
+            points = np.concatenate([[lo, hi], a[continuous], b[continuous], c[continuous], d[continuous], cuts])
+            points = np.unique(points[(lo <= points) & (points <= hi)])
+
+            # Salida agregada en los puntos de ruptura (lineal entre ellos)
+            coeffs = tuple(column[continuous] for column in self.propina_coeffs)
+            degrees = self.fuzzify_array(points, coeffs, self.propina_universe)
+            values = np.minimum(degrees, strengths[continuous, np.newaxis]).max(axis=0)
+
+            x0, x1 = points[:-1], points[1:]
+            f0, f1 = values[:-1], values[1:]
+            area = np.sum((x1 - x0) * (f0 + f1) / 2)
+            moment = np.sum((x1 - x0) * (x0 * (2 * f0 + f1) + x1 * (f0 + 2 * f1)) / 6)
+            return moment / area
+        else:
+            raise ValueError("Método de defuzzificación no soportado")
+
+    def _interval_union_mean(self, left, right):
+        """Punto medio (media de x) de la unión de los intervalos [left, right]"""
+        order = np.argsort(left)
+        merged = []
+        for start, stop in zip(left[order], right[order]):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], stop)
+            else:
+                merged.append([start, stop])
+        merged = np.array(merged)
+        lengths = merged[:, 1] - merged[:, 0]
+        if lengths.sum() == 0:
+            return merged[:, 0].mean()
+        return np.sum(lengths * (merged[:, 0] + merged[:, 1]) / 2) / lengths.sum()
+
+    def compute_exact(self, servicio_val, comida_val, method='centroid'):
+        """Propina con defuzzificación exacta (sin agregar sobre el universo)"""
+        return self.defuzzify_exact(self.consequent_strengths(servicio_val, comida_val), method)
+
+    def compute(self, servicio_val, comida_val, method='lom'):
+        """Propina nítida de un par de entradas (redondeadas a 2 decimales, con caché).
+
+        method es cualquiera de DEFUZZ_METHODS; los de EXACT_METHODS usan la
+        defuzzificación exacta.
+        """
+        if method in EXACT_METHODS:
+            return self.cache.get_or_compute(servicio_val, comida_val, method,
+                                             lambda s, c: self.compute_exact(s, c, EXACT_METHODS[method]))
+        return self.cache.get_or_compute(servicio_val, comida_val, method,
+                                         lambda s, c: self.defuzzify(self.infer(s, c), method))
+
+    def consequent_strengths_batch(self, servicio_vals, comida_vals):
+        """Fuerza máxima por término de propina para N entradas (N x términos de propina)"""
+        servicio_vals = np.atleast_1d(np.asarray(servicio_vals, dtype=float))
+        comida_vals = np.atleast_1d(np.asarray(comida_vals, dtype=float))
+        if servicio_vals.shape != comida_vals.shape:
+            raise ValueError("Las entradas deben tener la misma longitud")
+
+        # Fuzzificación y activación de reglas para todas las entradas (reglas x N)
+        firing = self.firing_strengths(servicio_vals, comida_vals)
+
+        strengths = np.zeros((len(servicio_vals), len(self.propina_names)))
+        for k, group in self.rule_groups:
+            strengths[:, k] = firing[group].max(axis=0)
+        return strengths
+
+    def defuzzify_exact_batch(self, strengths, method='lom'):
+        """Versión vectorizada de defuzzify_exact para 'lom' y 'som' (strengths: N x términos)"""
+        strengths = np.atleast_2d(np.asarray(strengths, dtype=float))
+        a, b, c, d = self.propina_params.T
+        height = strengths.max(axis=1, keepdims=True)
+        top = strengths == height
+        if method == 'lom':
+            right = np.where(top, d - height * (d - c), -np.inf).max(axis=1)
+            return np.where(height[:, 0] == 0, self.propina_universe[-1], right)
+        elif method == 'som':
+            left = np.where(top, a + height * (b - a), np.inf).min(axis=1)
+            return np.where(height[:, 0] == 0, self.propina_universe[0], left)
+        else:
+            raise ValueError("defuzzify_exact_batch solo admite 'lom' y 'som'")
+
+    def defuzzify_exact_rows(self, strengths, method='centroid'):
+        """defuzzify_exact para cada fila de strengths (N x términos); 'lom' y 'som' vectorizados"""
+        if method in ('lom', 'som'):
+            return self.defuzzify_exact_batch(strengths, method)
+        return np.array([self.defuzzify_exact(row, method) for row in strengths], dtype=float)
+
+    def infer_batch(self, servicio_vals, comida_vals, chunk_size=256):
+        """Inferencia vectorizada: devuelve una matriz (N x universo) con las salidas agregadas"""
+        servicio_vals = np.atleast_1d(np.asarray(servicio_vals, dtype=float))
+        comida_vals = np.atleast_1d(np.asarray(comida_vals, dtype=float))
+
+        # Pasos 1 y 2: Activación de reglas y fuerza máxima por término de consecuencia (N x términos)
+        strengths = self.consequent_strengths_batch(servicio_vals, comida_vals)
+
+        # Paso 3: Recorte y agregación por bloques (N x términos x universo) para acotar la memoria;
+        # el bloque recortado se reserva una vez y se reutiliza
+        aggregated = np.empty((len(servicio_vals), len(self.propina_universe)))
+        clipped_buffer = np.empty((min(chunk_size, len(servicio_vals)),) + self.propina_matrix.shape)
+        for start in range(0, len(servicio_vals), chunk_size):
+            block = strengths[start:start + chunk_size]
+            clipped = np.minimum(block[:, :, np.newaxis], self.propina_matrix[np.newaxis, :, :],
+                                 out=clipped_buffer[:len(block)])
+            clipped.max(axis=1, out=aggregated[start:start + chunk_size])
+
+        return aggregated
+
+    def defuzzify_batch(self, aggregated_outputs, method='centroid'):
+        """Defuzzificación vectorizada: un valor nítido por cada fila de la matriz agregada"""
+        return self.defuzzify_rows(aggregated_outputs, self.propina_universe, self.propina_weights, method)
+
+    @staticmethod
+    def defuzzify_rows(aggregated_outputs, universe, weights=None, method='centroid'):
+        """Un valor nítido por fila de salidas agregadas sobre universe (weights: universe_weights)"""
+        aggregated_outputs = np.atleast_2d(aggregated_outputs)
+        if method == 'centroid':
+            # Método del centroide (0 cuando ninguna regla se activa)
+            if weights is not None:
+                aggregated_outputs = aggregated_outputs * weights
+            total = np.sum(aggregated_outputs, axis=1)
+            weighted = np.sum(universe * aggregated_outputs, axis=1)
+            safe_total = np.where(total == 0, 1, total)
+            return np.where(total == 0, 0, weighted / safe_total)
+        elif method == 'lom':
+            # Last of Maximum: primer máximo recorriendo el universo al revés
+            last = aggregated_outputs.shape[1] - 1 - np.argmax(aggregated_outputs[:, ::-1], axis=1)
+            return universe[last]
+        else:
+            raise ValueError(f"Método de defuzzificación no soportado: {method} (los exactos se piden a compute/compute_batch)")
+
+    def compute_batch(self, servicio_vals, comida_vals, method='lom', chunk_size=256):
+        """Calcula N propinas en una llamada procesando las entradas por bloques"""
+        servicio_vals = np.atleast_1d(np.asarray(servicio_vals, dtype=float))
+        comida_vals = np.atleast_1d(np.asarray(comida_vals, dtype=float))
+        # Con NaN no se activa ninguna regla y 'lom' devolvería el final del universo (15)
+        for name, values in (('servicio', servicio_vals), ('comida', comida_vals)):
+            if not np.isfinite(values).all():
+                rows = np.flatnonzero(~np.isfinite(values))
+                raise ValueError(f"Valores de {name} no finitos en las posiciones {rows[:10].tolist()}")
+        if method in EXACT_METHODS:
+            return self.defuzzify_exact_rows(self.consequent_strengths_batch(servicio_vals, comida_vals),
+                                             EXACT_METHODS[method])
+        tips = np.empty(len(servicio_vals))
+        for start in range(0, len(servicio_vals), chunk_size):
+            stop = start + chunk_size
+            aggregated = self.infer_batch(servicio_vals[start:stop], comida_vals[start:stop], chunk_size)
+            tips[start:stop] = self.defuzzify_batch(aggregated, method)
+        return tips
+
+    def compile_table(self, method='lom', resolution=None):
+        """Precalcula la propina sobre toda la rejilla servicio x comida (501 x 501).
+
+        Con universos adaptativos (no uniformes) hay que indicar resolution: la
+        tabla usa entonces una rejilla uniforme de resolution x resolution.
+        """
+        servicio_grid, comida_grid = self.servicio_universe, self.comida_universe
+        if resolution is not None:
+            servicio_grid = np.linspace(servicio_grid[0], servicio_grid[-1], resolution)
+            comida_grid = np.linspace(comida_grid[0], comida_grid[-1], resolution)
+        return TipLookupTable.compile(lambda s, c: self.compute_batch(s, c, method), servicio_grid, comida_grid)
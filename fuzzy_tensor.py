@@ -0,0 +1,180 @@
+"""Sistema difuso Mamdani con un número arbitrario de entradas.
+
+FuzzySystem fija dos antecedentes (servicio y comida). TensorFuzzySystem acepta
+cualquier lista de variables de entrada y una tabla de reglas N-dimensional, con
+un eje por entrada y el término de salida de cada combinación. Las reglas se
+compilan en una máscara booleana (términos de cada entrada x términos de
+salida). La inferencia calcula el mínimo exterior (AND) por broadcasting solo
+sobre los términos activos de cada entrada. Así el coste crece con el producto
+de términos activos (normalmente 2 por entrada) y no con el producto cartesiano
+completo de la base de reglas.
+
+Ejemplo con una tercera entrada (tiempo de espera en minutos):
+    base = FuzzySystem()
+    espera = ('espera', np.linspace(0, 60, 601), {
+        'corta': ('trapmf', [0, 0, 10, 20]),
+        'media': ('trimf', [10, 25, 40]),
+        'larga': ('trapmf', [30, 45, 60, 60]),
+    })
+    tabla = np.empty((5, 5, 3), dtype=object)    # servicio x comida x espera
+    ...
+    sistema = TensorFuzzySystem([('servicio', base.servicio_universe, base.servicio_shapes),
+                                 ('comida', base.comida_universe, base.comida_shapes),
+                                 espera],
+                                ('propina', base.propina_universe, base.propina_shapes),
+                                rule_table=tabla)
+    sistema.compute(4, 3.5, 12)
+"""
+import functools
+
+import numpy as np
+
+import membership
+from fuzzy_system import FuzzySystem
+
+
+class TensorFuzzySystem:
+    def __init__(self, inputs, output, rule_table=None, rules=()):
+        """inputs es una lista de (nombre, universo, shapes) y output un (nombre, universo, shapes).
+
+        Los shapes usan el formato de FuzzySystem: {término: (tipo, parámetros)}.
+        """
+        self.input_names = [name for name, _, _ in inputs]
+        self.input_universes = [np.asarray(universe, dtype=float) for _, universe, _ in inputs]
+        self.input_shapes = [shapes for _, _, shapes in inputs]
+        self.input_terms = [list(shapes) for shapes in self.input_shapes]
+        self.input_coeffs = [membership.trapezoid_coeffs(FuzzySystem.trapezoid_params(shapes))
+                             for shapes in self.input_shapes]
+
+        self.output_name, output_universe, self.output_shapes = output
+        self.output_universe = np.asarray(output_universe, dtype=float)
+        self.output_terms = list(self.output_shapes)
+        # Funciones de membresía de salida apiladas (términos x universo)
+        self.output_matrix = membership.evaluate(self.output_universe, self.output_shapes)
+        self.output_weights = FuzzySystem.universe_weights(self.output_universe)
+
+        self.compile_rules(rule_table, rules)
+
+    @classmethod
+    def from_fuzzy_system(cls, fuzzy_system):
+        """Versión de dos entradas equivalente a un FuzzySystem (mismos términos y reglas)"""
+        inputs = [('servicio', fuzzy_system.servicio_universe, fuzzy_system.servicio_shapes),
+                  ('comida', fuzzy_system.comida_universe, fuzzy_system.comida_shapes)]
+        output = ('propina', fuzzy_system.propina_universe, fuzzy_system.propina_shapes)
+        return cls(inputs, output, rules=fuzzy_system.rules)
+
+    def compile_rules(self, rule_table=None, rules=()):
+        """Compila las reglas en self.rule_mask (términos de cada entrada... x términos de salida).
+
+        rule_table es un array N-dimensional (un eje por entrada, en el orden de
+        inputs) con el nombre del término de salida de cada combinación, o None
+        / '' donde no hay regla. rules añade reglas sueltas en el formato de
+        FuzzySystem.create_rules; una entrada que no aparece en la regla vale
+        para cualquier término.
+        """
+        shape = tuple(len(terms) for terms in self.input_terms)
+        mask = np.zeros(shape + (len(self.output_terms),), dtype=bool)
+
+        if rule_table is not None:
+            rule_table = np.asarray(rule_table, dtype=object)
+            if rule_table.shape != shape:
+                raise ValueError(f"La tabla de reglas debe tener forma {shape}")
+            for index, consequent in np.ndenumerate(rule_table):
+                if consequent:
+                    mask[index + (self.output_terms.index(consequent),)] = True
+
+        for rule in rules:
+            index = tuple(terms.index(rule[name]) if name in rule else slice(None)
+                          for name, terms in zip(self.input_names, self.input_terms))
+            mask[index + (self.output_terms.index(rule[self.output_name]),)] = True
+
+        self.rule_mask = mask
+
+    def fuzzify(self, values):
+        """Grados de cada término para cada entrada (una matriz términos x N por entrada)"""
+        if len(values) != len(self.input_names):
+            raise ValueError(f"Se esperaban {len(self.input_names)} entradas")
+        return [FuzzySystem.fuzzify_array(value, coeffs, universe)
+                for value, coeffs, universe in zip(values, self.input_coeffs, self.input_universes)]
+
+    def consequent_strengths(self, *values):
+        """Fuerza máxima de las reglas que concluyen cada término de salida (entradas escalares)"""
+        degrees = self.fuzzify(values)
+        active = [np.flatnonzero(d) for d in degrees]
+        strengths = np.zeros(len(self.output_terms))
+        if any(len(a) == 0 for a in active):
+            return strengths
+
+        # Mínimo exterior de los grados activos: un eje por entrada
+        firing = degrees[0][active[0]]
+        for d, a in zip(degrees[1:], active[1:]):
+            firing = np.minimum.outer(firing, d[a])
+
+        # Reglas de las combinaciones activas; max-min sobre todos los ejes de entrada
+        mask = self.rule_mask[np.ix_(*active)]
+        return np.where(mask, firing[..., np.newaxis], 0.0).reshape(-1, len(self.output_terms)).max(axis=0)
+
+    def consequent_strengths_batch(self, *value_arrays):
+        """Fuerzas por término de salida para N entradas (N x términos de salida).
+
+        De cada entrada se toman los k términos de mayor grado, con k el máximo
+        de términos activos en el lote; el tensor de activación tiene forma
+        (N, k1, ..., kn) en lugar de (N, términos1, ..., términosn).
+        """
+        values = [np.atleast_1d(np.asarray(v, dtype=float)) for v in value_arrays]
+        if any(v.shape != values[0].shape for v in values):
+            raise ValueError("Las entradas deben tener la misma longitud")
+        n = len(values[0])
+        if n == 0:
+            return np.zeros((0, len(self.output_terms)))
+
+        picked_degrees = []
+        picked_terms = []
+        for axis, degrees in enumerate(self.fuzzify(values)):
+            k = max(int((degrees > 0).sum(axis=0).max()), 1)
+            order = np.argsort(-degrees, axis=0, kind='stable')[:k].T
+            # Cada entrada ocupa su propio eje para el broadcasting
+            shape = (n,) + (1,) * axis + (k,) + (1,) * (len(values) - axis - 1)
+            picked_terms.append(order.reshape(shape))
+            picked_degrees.append(np.take_along_axis(degrees.T, order, axis=1).reshape(shape))
+
+        firing = functools.reduce(np.minimum, picked_degrees)
+        mask = self.rule_mask[tuple(picked_terms)]
+        clipped = np.where(mask, firing[..., np.newaxis], 0.0)
+        return clipped.reshape(n, -1, len(self.output_terms)).max(axis=1)
+
+    def infer(self, *values):
+        """Salida agregada para un conjunto de entradas escalares"""
+        strengths = self.consequent_strengths(*values)
+        aggregated = np.zeros(len(self.output_universe))
+        for k in np.flatnonzero(strengths):
+            np.maximum(aggregated, np.minimum(strengths[k], self.output_matrix[k]), out=aggregated)
+        return aggregated
+
+    def infer_batch(self, *value_arrays, chunk_size=256):
+        """Salidas agregadas (N x universo), recortando por bloques para acotar la memoria"""
+        strengths = self.consequent_strengths_batch(*value_arrays)
+        aggregated = np.empty((len(strengths), len(self.output_universe)))
+        for start in range(0, len(strengths), chunk_size):
+            block = strengths[start:start + chunk_size]
+            clipped = np.minimum(block[:, :, np.newaxis], self.output_matrix[np.newaxis, :, :])
+            aggregated[start:start + chunk_size] = clipped.max(axis=1)
+        return aggregated
+
+    def defuzzify_batch(self, aggregated_outputs, method='centroid'):
+        """Un valor nítido por fila (mismos métodos que FuzzySystem.defuzzify_batch)"""
+        return FuzzySystem.defuzzify_rows(aggregated_outputs, self.output_universe, self.output_weights, method)
+
+    def compute(self, *values, method='lom'):
+        """Salida nítida para un conjunto de entradas escalares"""
+        return self.defuzzify_batch(self.infer(*values), method)[0]
+
+    def compute_batch(self, *value_arrays, method='lom', chunk_size=256):
+        """N salidas nítidas en una llamada, procesando las entradas por bloques"""
+        values = [np.atleast_1d(np.asarray(v, dtype=float)) for v in value_arrays]
+        outputs = np.empty(len(values[0]))
+        for start in range(0, len(outputs), chunk_size):
+            block = [v[start:start + chunk_size] for v in values]
+            outputs[start:start + chunk_size] = self.defuzzify_batch(self.infer_batch(*block, chunk_size=chunk_size),
+                                                                     method)
+        return outputs
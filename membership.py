@@ -0,0 +1,81 @@
+"""Funciones de membresía vectorizadas.
+
+Todas las formas se expresan como trapecios (a, b, c, d): un trimf [a, b, c]
+es (a, b, b, c) y un singleton v es (v, v, v, v). Cada término se evalúa en una
+sola pasada como min(subida, bajada) limitado a [0, 1]. Los lados verticales
+(a == b o c == d) son escalones exactos, sin dividir por cero, así que los
+hombros (trapmf [0, 0, 1, 1.5]) y los singletons ([15, 15, 15]) valen 1 justo en
+su punto. trapezoids() evalúa muchos términos a la vez en un array 2-D
+(términos x universo).
+"""
+import numpy as np
+
+
+def trapezoid_params(shapes):
+    """Expresa cada término como trapecio (a, b, c, d): una fila por término.
+
+    shapes es {término: (tipo, parámetros)} con tipo 'trimf', 'trapmf' o
+    'singletonmf'.
+    """
+    params = []
+    for kind, values in shapes.values():
+        if kind == 'trimf':
+            a, b, c = values
+            params.append([a, b, b, c])
+        elif kind == 'trapmf':
+            params.append(list(values))
+        elif kind == 'singletonmf':
+            params.append([values] * 4)
+        else:
+            raise ValueError(f"Función de membresía no soportada: {kind}")
+    return np.array(params, dtype=float).reshape(-1, 4)
+
+
+def trapezoid_coeffs(params):
+    """Columnas (a, d, den. subida, subida vertical, den. bajada, bajada vertical) de cada trapecio.
+
+    Se precalculan una vez para evaluar muchas veces con trapezoids_from_coeffs.
+    Un lado vertical tiene denominador infinito y vale 1 en todo el tramo.
+    """
+    a, b, c, d = (np.asarray(params, dtype=float).reshape(-1, 4)[:, [i]] for i in range(4))
+    rise_flat = (b == a).astype(float)
+    fall_flat = (d == c).astype(float)
+    rise_den = np.where(b > a, b - a, np.inf)
+    fall_den = np.where(d > c, d - c, np.inf)
+    return a, d, rise_den, rise_flat, fall_den, fall_flat
+
+
+def trapezoids_from_coeffs(x, coeffs):
+    """Grados de los trapecios de coeffs sobre x (términos x forma de x)"""
+    a, d, rise_den, rise_flat, fall_den, fall_flat = coeffs
+    x = np.asarray(x, dtype=float)
+    rising = (x - a) / rise_den + rise_flat
+    falling = (d - x) / fall_den + fall_flat
+    return np.where((a <= x) & (x <= d), np.minimum(np.minimum(rising, falling), 1.0), 0.0)
+
+
+def trapezoids(x, params, dtype=np.float64):
+    """Grados de varios trapecios sobre x (términos x len(x)) en una sola pasada"""
+    x = np.asarray(x, dtype=float).reshape(-1)
+    return trapezoids_from_coeffs(x, trapezoid_coeffs(params)).astype(dtype, copy=False)
+
+
+def evaluate(x, shapes, dtype=np.float64):
+    """Funciones de todos los términos de shapes apiladas (términos x len(x))"""
+    return trapezoids(x, trapezoid_params(shapes), dtype)
+
+
+def trimf(x, params):
+    """Función triangular de membresía"""
+    a, b, c = params
+    return trapezoids(x, [a, b, b, c])[0]
+
+
+def trapmf(x, params):
+    """Función trapezoidal de membresía"""
+    return trapezoids(x, params)[0]
+
+
+def singletonmf(x, value):
+    """Función singleton de membresía (1 solo donde x == value)"""
+    return trapezoids(x, [value] * 4)[0]
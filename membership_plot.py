@@ -0,0 +1,114 @@
+"""Gráficas de membresía con fondo estático en caché y superposición por blitting.
+
+Las curvas de membresía se dibujan una sola vez. Tras cada dibujo completo (el
+inicial o al redimensionar la ventana) se guarda el fondo de cada eje, y al
+recalcular solo se restaura ese fondo y se pintan los artistas animados:
+marcadores de las entradas, consecuentes recortados, salida agregada y línea
+de la propina. Funciona con cualquier canvas de matplotlib que admita blitting
+(FigureCanvasTkAgg en las dos aplicaciones) y no importa matplotlib.
+"""
+import numpy as np
+
+
+class AxesOverlay:
+    """Artistas animados sobre un eje cuyo fondo se guarda en caché"""
+
+    def __init__(self, canvas, ax):
+        self.canvas = canvas
+        self.ax = ax
+        self.artists = []
+        self.background = None
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def add(self, artist):
+        """Registra un artista: queda fuera del dibujo completo y se pinta en blit()"""
+        artist.set_animated(True)
+        self.artists.append(artist)
+        return artist
+
+    def on_draw(self, event):
+        # Dibujo completo: se renueva el fondo y se repinta la superposición encima
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        for artist in self.artists:
+            self.ax.draw_artist(artist)
+
+    def blit(self):
+        """Restaura el fondo y pinta solo los artistas animados"""
+        if self.background is None:
+            # Aún no se ha dibujado (p. ej. pestaña oculta): on_draw los pintará
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.canvas.blit(self.ax.bbox)
+
+
+class FuzzyResultOverlay:
+    """Resultado de una inferencia sobre las gráficas de membresía.
+
+    input_overlays tiene un AxesOverlay por variable de entrada y
+    output_overlay es el del eje de salida; output_matrix son las funciones de
+    salida apiladas (términos x universo), en el mismo orden que las fuerzas
+    que recibe update().
+    """
+
+    def __init__(self, input_overlays, output_overlay, output_universe, output_matrix, colors):
+        self.output_universe = np.asarray(output_universe, dtype=float)
+        self.output_matrix = np.asarray(output_matrix, dtype=float)
+        self.overlays = list(dict.fromkeys([*input_overlays, output_overlay]))
+        self.last = None
+
+        self.markers = [overlay.add(overlay.ax.axvline(0, color='#333333', linestyle='--', linewidth=1.5,
+                                                       visible=False))
+                        for overlay in input_overlays]
+
+        ax = output_overlay.ax
+        zeros = np.zeros_like(self.output_universe)
+        self.clipped = [output_overlay.add(ax.plot(self.output_universe, zeros, color=color, linewidth=1.5,
+                                                   linestyle=':', visible=False)[0])
+                        for color in colors]
+        self.aggregated = output_overlay.add(ax.fill(self.output_universe, zeros, color='#555555', alpha=0.3,
+                                                     visible=False)[0])
+        self.tip_line = output_overlay.add(ax.axvline(0, color='black', linewidth=2, visible=False))
+        self.output_overlay = output_overlay
+        self.highlighted = output_overlay.add(ax.plot(self.output_universe, zeros, color='#c0392b', linewidth=3,
+                                                      visible=False)[0])
+
+    def update(self, input_values, strengths, tip):
+        """Actualiza la superposición; no hace nada si el resultado no ha cambiado"""
+        strengths = np.asarray(strengths, dtype=float)
+        key = (tuple(input_values), tuple(strengths), tip)
+        if key == self.last:
+            return
+        self.last = key
+
+        for marker, value in zip(self.markers, input_values):
+            marker.set_xdata([value, value])
+            marker.set_visible(True)
+
+        clipped = np.minimum(strengths[:, np.newaxis], self.output_matrix)
+        for line, row, strength in zip(self.clipped, clipped, strengths):
+            line.set_ydata(row)
+            line.set_visible(strength > 0)
+
+        aggregated = clipped.max(axis=0)
+        universe = self.output_universe
+        self.aggregated.set_xy(np.column_stack([np.r_[universe[0], universe, universe[-1]],
+                                                np.r_[0, aggregated, 0]]))
+        self.aggregated.set_visible(True)
+
+        self.tip_line.set_xdata([tip, tip])
+        self.tip_line.set_visible(True)
+        self.highlighted.set_visible(False)
+
+        for overlay in self.overlays:
+            overlay.blit()
+
+    def highlight(self, output):
+        """Resalta el consecuente recortado de una regla (None para quitarlo)"""
+        if output is not None:
+            self.highlighted.set_ydata(output)
+        self.highlighted.set_visible(output is not None)
+        self.output_overlay.blit()
@@ -0,0 +1,159 @@
+"""Formato de fichero para un modelo difuso ya compilado.
+
+Un solo .npy (bytes) guarda los universos, las funciones de membresía apiladas,
+los índices de las reglas compiladas, el método de defuzzificación y los
+umbrales de las categorías de propina. El contenido es:
+
+    MAGIC | longitud de la cabecera (uint64) | cabecera JSON | arrays alineados a 64 bytes
+
+Se carga con np.load(mmap_mode='r') y los arrays del modelo son vistas sobre el
+fichero proyectado. Arrancar un proceso no vuelve a muestrear ninguna función y
+los procesos que cargan el mismo fichero comparten sus páginas. La cabecera
+incluye un hash SHA-256 del contenido (arrays, términos, método y categorías)
+para comprobar que dos modelos son idénticos.
+
+Uso:
+    CompiledModel.from_fuzzy_system(FuzzySystem(), 'lom').save('modelo.npy')
+    modelo = CompiledModel.load('modelo.npy')
+    modelo.compute(3.5, 4), modelo.content_hash
+"""
+import hashlib
+import json
+
+import numpy as np
+
+from fuzzy_system import FuzzySystem, TIP_CATEGORIES, get_tip_category, get_tip_categories
+
+MAGIC = b'FUZZMODL'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def content_hash(arrays, metadata, method, categories):
+    """SHA-256 del contenido del modelo; no depende de la versión ni de la disposición del fichero"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps({'metadata': metadata, 'method': method, 'categories': categories},
+                             sort_keys=True).encode())
+    for name in sorted(arrays):
+        array = np.ascontiguousarray(arrays[name])
+        digest.update(f"{name}:{array.dtype.str}:{array.shape}".encode())
+        digest.update(array.data)
+    return 'sha256:' + digest.hexdigest()
+
+
+def _json_shapes(shapes):
+    return {term: [kind, params] for term, (kind, params) in shapes.items()}
+
+
+def _tuple_shapes(shapes):
+    return {term: (kind, params) for term, (kind, params) in shapes.items()}
+
+
+class CompiledModel:
+    """FuzzySystem construido más el método de defuzzificación y las categorías de propina"""
+
+    def __init__(self, system, method='lom', categories=TIP_CATEGORIES, content_hash=None):
+        self.system = system
+        self.method = method
+        self.categories = [(threshold, category) for threshold, category in categories]
+        self.content_hash = content_hash or self.compute_hash()
+
+    @classmethod
+    def from_fuzzy_system(cls, fuzzy_system, method='lom', categories=TIP_CATEGORIES):
+        return cls(fuzzy_system, method, categories)
+
+    def metadata(self):
+        """Metadatos del modelo en forma serializable a JSON"""
+        return {name: _json_shapes(shapes) for name, shapes in self.system.model_metadata().items()}
+
+    def compute_hash(self):
+        return content_hash(self.system.model_arrays(), self.metadata(), self.method,
+                            [list(c) for c in self.categories])
+
+    def compute(self, servicio_val, comida_val):
+        """Propina con el método del modelo"""
+        return self.system.compute(servicio_val, comida_val, self.method)
+
+    def compute_batch(self, servicio_vals, comida_vals):
+        return self.system.compute_batch(servicio_vals, comida_vals, self.method)
+
+    def category(self, value):
+        """Categoría de una propina con los umbrales del modelo"""
+        return get_tip_category(value, self.categories)
+
+    def categories_of(self, values):
+        return get_tip_categories(values, self.categories)
+
+    def save(self, path):
+        """Escribe el modelo en un único fichero .npy"""
+        arrays = {name: np.ascontiguousarray(array) for name, array in self.system.model_arrays().items()}
+
+        layout = {}
+        offset = 0
+        for name, array in arrays.items():
+            layout[name] = {'offset': offset, 'shape': list(array.shape), 'dtype': array.dtype.str}
+            offset = _aligned(offset + array.nbytes)
+
+        header = json.dumps({
+            'version': FORMAT_VERSION,
+            'content_hash': self.content_hash,
+            'method': self.method,
+            'categories': [list(c) for c in self.categories],
+            'metadata': self.metadata(),
+            'arrays': layout,
+        }).encode()
+        # Los offsets de los arrays son relativos al inicio de la zona de datos
+        data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+        payload = np.zeros(data_start + offset, dtype=np.uint8)
+        payload[:len(MAGIC)] = np.frombuffer(MAGIC, dtype=np.uint8)
+        payload[len(MAGIC):len(MAGIC) + 8] = np.frombuffer(np.uint64(len(header)).tobytes(), dtype=np.uint8)
+        payload[len(MAGIC) + 8:len(MAGIC) + 8 + len(header)] = np.frombuffer(header, dtype=np.uint8)
+        for name, array in arrays.items():
+            start = data_start + layout[name]['offset']
+            payload[start:start + array.nbytes] = np.frombuffer(array.tobytes(), dtype=np.uint8)
+
+        path = str(path)
+        if not path.endswith('.npy'):
+            path += '.npy'
+        np.save(path, payload)
+        return path
+
+    @classmethod
+    def load(cls, path, mmap=True, verify=False):
+        """Carga un modelo guardado; con mmap los arrays son vistas de solo lectura sobre el fichero.
+
+        verify recalcula el hash (lee todo el fichero) y falla si no coincide.
+        """
+        path = str(path)
+        if not path.endswith('.npy'):
+            path += '.npy'
+        raw = np.load(path, mmap_mode='r' if mmap else None)
+        if raw.dtype != np.uint8 or raw.ndim != 1 or bytes(raw[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} no es un modelo difuso compilado")
+        header_size = int(np.frombuffer(bytes(raw[len(MAGIC):len(MAGIC) + 8]), dtype=np.uint64)[0])
+        header = json.loads(bytes(raw[len(MAGIC) + 8:len(MAGIC) + 8 + header_size]))
+        if header['version'] > FORMAT_VERSION:
+            raise ValueError(f"Versión de modelo no soportada: {header['version']}")
+
+        data_start = _aligned(len(MAGIC) + 8 + header_size)
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            start = data_start + spec['offset']
+            count = int(np.prod(spec['shape'], dtype=np.int64))
+            arrays[name] = raw[start:start + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+
+        # Se comprueba sobre los arrays leídos, antes de construir el sistema con ellos
+        if verify and content_hash(arrays, header['metadata'], header['method'],
+                                   header['categories']) != header['content_hash']:
+            raise ValueError(f"El hash de {path} no coincide con su contenido")
+
+        metadata = {name: _tuple_shapes(shapes) for name, shapes in header['metadata'].items()}
+        categories = [tuple(c) for c in header['categories']]
+        system = FuzzySystem.from_model(arrays, metadata)
+        return cls(system, header['method'], categories, header['content_hash'])
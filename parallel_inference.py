@@ -0,0 +1,126 @@
+"""Inferencia por lotes repartida entre procesos con el modelo en memoria compartida.
+
+Los arrays del modelo (universos, funciones de membresía apiladas y reglas
+compiladas) se copian una sola vez a bloques de multiprocessing.shared_memory.
+Cada proceso trabajador monta vistas NumPy sobre esos bloques y reconstruye el
+FuzzySystem con FuzzySystem.from_model, sin recibirlos serializados ni volver a
+muestrear las funciones de membresía. Solo viajan las entradas de cada trozo y
+las propinas calculadas, que se devuelven en el orden de entrada.
+
+Con model_path, cada trabajador carga un fichero de CompiledModel proyectado
+en memoria (mmap) en lugar de copiar el modelo a memoria compartida.
+
+Uso:
+    with ParallelInference(FuzzySystem(), workers=4) as parallel:
+        tips = parallel.compute_batch(servicio_vals, comida_vals, 'lom')
+
+    with ParallelInference(model_path='modelo.npy') as parallel:
+        ...
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from fuzzy_system import FuzzySystem
+from model_file import CompiledModel
+
+_worker_system = None
+_worker_blocks = []
+
+
+class SharedFuzzyModel:
+    """Copia de model_arrays() en bloques de memoria compartida"""
+
+    def __init__(self, fuzzy_system):
+        self.metadata = fuzzy_system.model_metadata()
+        self.spec = {}
+        self.blocks = []
+        for name, array in fuzzy_system.model_arrays().items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.spec[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        """Libera los bloques (solo desde el proceso que los creó)"""
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def attach_model(spec, metadata):
+    """Monta el modelo compartido en este proceso; devuelve el FuzzySystem y los bloques abiertos"""
+    arrays = {}
+    blocks = []
+    for name, (block_name, shape, dtype) in spec.items():
+        # Los trabajadores comparten el resource_tracker del proceso creador,
+        # que es quien libera los bloques en close()
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        array = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+    return FuzzySystem.from_model(arrays, metadata), blocks
+
+
+def _init_worker(spec, metadata):
+    global _worker_system, _worker_blocks
+    _worker_system, _worker_blocks = attach_model(spec, metadata)
+
+
+def _init_worker_from_file(model_path):
+    global _worker_system
+    _worker_system = CompiledModel.load(model_path).system
+
+
+def _compute_shard(servicio_vals, comida_vals, method):
+    return _worker_system.compute_batch(servicio_vals, comida_vals, method)
+
+
+class ParallelInference:
+    """Reserva de procesos que comparten un mismo modelo difuso"""
+
+    def __init__(self, fuzzy_system=None, workers=None, model_path=None):
+        self.workers = workers or os.cpu_count() or 1
+        if model_path is not None:
+            # Los trabajadores comparten las páginas del fichero proyectado
+            self.model = None
+            initializer, initargs = _init_worker_from_file, (str(model_path),)
+        else:
+            self.model = SharedFuzzyModel(fuzzy_system)
+            initializer, initargs = _init_worker, (self.model.spec, self.model.metadata)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=initializer, initargs=initargs)
+
+    def submit(self, servicio_vals, comida_vals, method='lom'):
+        """Envía un trozo a la reserva; devuelve un Future con sus propinas"""
+        return self.executor.submit(_compute_shard, np.asarray(servicio_vals, dtype=float),
+                                    np.asarray(comida_vals, dtype=float), method)
+
+    def compute_batch(self, servicio_vals, comida_vals, method='lom', shard_size=None):
+        """Propinas de todas las entradas, repartidas en trozos y devueltas en orden"""
+        servicio_vals = np.atleast_1d(np.asarray(servicio_vals, dtype=float))
+        comida_vals = np.atleast_1d(np.asarray(comida_vals, dtype=float))
+        if servicio_vals.shape != comida_vals.shape:
+            raise ValueError("Las entradas deben tener la misma longitud")
+        if len(servicio_vals) == 0:
+            return np.empty(0)
+        shard_size = shard_size or -(-len(servicio_vals) // self.workers)
+        starts = range(0, len(servicio_vals), shard_size)
+        futures = [self.submit(servicio_vals[i:i + shard_size], comida_vals[i:i + shard_size], method)
+                   for i in starts]
+        return np.concatenate([future.result() for future in futures])
+
+    def close(self):
+        self.executor.shutdown()
+        if self.model is not None:
+            self.model.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
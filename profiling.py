@@ -0,0 +1,229 @@
+"""Medición opcional por etapas del cálculo de propinas.
+
+StageProfiler sustituye, solo en la instancia medida, algunos métodos por
+versiones que registran el tiempo, el número de llamadas y (opcionalmente) el
+pico de memoria reservada. Mientras no se instrumenta nada, el código no tiene
+ninguna comprobación adicional. uninstrument() restaura los métodos de la
+clase.
+
+Cada etapa acumula un histograma de tiempos por llamada (tiempo inclusivo) y
+también el tiempo propio, sin las etapas anidadas. Por ejemplo, el tiempo
+propio de 'infer' en modo 'sparse' es el bucle de reglas más la agregación,
+porque la fuzzificación cuenta en 'fuzzify'. Se exporta como JSON
+(snapshot()) o como texto para Prometheus (to_prometheus()).
+
+Uso:
+    profiler = StageProfiler()
+    profiler.instrument_fuzzy_system(sistema)
+    ...
+    print(profiler.to_prometheus())
+"""
+import bisect
+import functools
+import threading
+import time
+import tracemalloc
+
+# Límites superiores de los cubos del histograma (segundos)
+DEFAULT_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+                   1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0)
+
+# Métodos medidos de FuzzySystem y etapa a la que corresponden
+FUZZY_SYSTEM_STAGES = {
+    'compute': 'compute',
+    'fuzzify_array': 'fuzzify',
+    'firing_strengths': 'rules',
+    'infer': 'infer',
+    'defuzzify': 'defuzzify',
+    'infer_batch': 'infer_batch',
+    'defuzzify_batch': 'defuzzify_batch',
+}
+
+# Métodos medidos de ControlSystemSimulation (skfuzzy), con prefijo propio para que
+# un mismo profiler pueda medir los dos motores sin mezclar sus histogramas. La
+# fuzzificación no es un método de la simulación: queda en el tiempo propio de
+# 'skfuzzy.compute'.
+SIMULATION_STAGES = {
+    'compute': 'skfuzzy.compute',
+    'compute_rule': 'skfuzzy.rules',
+    'defuzz_consequents': 'skfuzzy.defuzzify',
+}
+
+
+class StageStats:
+    """Histograma y totales de una etapa"""
+
+    def __init__(self, buckets):
+        self.count = 0
+        self.seconds = 0.0
+        self.self_seconds = 0.0
+        self.max_seconds = 0.0
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.alloc_peak_bytes = 0
+        self.alloc_bytes = 0
+
+
+class StageProfiler:
+    """Tiempos por etapa con histograma; track_allocations usa tracemalloc (más lento)"""
+
+    def __init__(self, prefix='fuzzy', buckets=DEFAULT_BUCKETS, track_allocations=False):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.track_allocations = track_allocations
+        self.stats = {}
+        self.instrumented = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def instrument(self, obj, stages):
+        """Mide los métodos de obj indicados en stages ({método: etapa})"""
+        methods = []
+        for method, stage in stages.items():
+            if method in vars(obj):
+                continue  # ya instrumentado
+            setattr(obj, method, self.wrap(getattr(obj, method), stage))
+            methods.append(method)
+        with self._lock:
+            self.instrumented.append((obj, methods))
+        return obj
+
+    def instrument_fuzzy_system(self, fuzzy_system):
+        return self.instrument(fuzzy_system, FUZZY_SYSTEM_STAGES)
+
+    def instrument_simulation(self, simulacion):
+        return self.instrument(simulacion, SIMULATION_STAGES)
+
+    def instrument_pool(self, pool):
+        """Mide las simulaciones de una SimulationPool: las libres ahora y las que cree después.
+
+        Una simulación prestada en este momento a otro hilo se mide cuando se
+        vuelva a crear.
+        """
+        for simulacion in pool.idle_simulations():
+            self.instrument_simulation(simulacion)
+        pool.simulation_hooks.append(self.instrument_simulation)
+        self.instrument(pool, {'compute': 'skfuzzy.pool.compute'})
+        with self._lock:
+            self.instrumented.append((pool, None))
+
+    def uninstrument(self):
+        """Restaura todos los métodos originales"""
+        with self._lock:
+            instrumented, self.instrumented = self.instrumented, []
+        for obj, methods in instrumented:
+            if methods is None:
+                obj.simulation_hooks.remove(self.instrument_simulation)
+                continue
+            for method in methods:
+                delattr(obj, method)
+
+    def wrap(self, fn, stage):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            frame = self._enter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._exit(stage, frame)
+        return timed
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self):
+        stack = self._stack()
+        # Marco: [inicio, tiempo de etapas anidadas, memoria al entrar, pico hasta ahora]
+        frame = [0.0, 0.0, 0, 0]
+        if self.track_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                parent = stack[-1]
+                parent[3] = max(parent[3], peak - parent[2])
+            tracemalloc.reset_peak()
+            frame[2] = current
+        stack.append(frame)
+        frame[0] = time.perf_counter()
+        return frame
+
+    def _exit(self, stage, frame):
+        elapsed = time.perf_counter() - frame[0]
+        stack = self._stack()
+        stack.pop()
+        if stack:
+            stack[-1][1] += elapsed
+
+        if self.track_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            alloc_peak = max(frame[3], peak - frame[2])
+            alloc = max(current - frame[2], 0)
+
+        with self._lock:
+            stats = self.stats.get(stage)
+            if stats is None:
+                stats = self.stats[stage] = StageStats(self.buckets)
+            stats.count += 1
+            stats.seconds += elapsed
+            stats.self_seconds += elapsed - frame[1]
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+            stats.bucket_counts[bisect.bisect_left(self.buckets, elapsed)] += 1
+            if self.track_allocations:
+                stats.alloc_peak_bytes = max(stats.alloc_peak_bytes, alloc_peak)
+                stats.alloc_bytes += alloc
+
+    def reset(self):
+        with self._lock:
+            self.stats = {}
+
+    def snapshot(self):
+        """Estadísticas por etapa como diccionario serializable a JSON"""
+        with self._lock:
+            result = {}
+            for stage, stats in self.stats.items():
+                cumulative = 0
+                buckets = {}
+                for bound, count in zip(self.buckets, stats.bucket_counts):
+                    cumulative += count
+                    buckets[repr(bound)] = cumulative
+                buckets['+Inf'] = stats.count
+                result[stage] = {
+                    'count': stats.count,
+                    'seconds': stats.seconds,
+                    'self_seconds': stats.self_seconds,
+                    'mean_us': stats.seconds / stats.count * 1e6,
+                    'max_us': stats.max_seconds * 1e6,
+                    'buckets': buckets,
+                }
+                if self.track_allocations:
+                    result[stage].update(alloc_peak_bytes=stats.alloc_peak_bytes,
+                                         retained_bytes=stats.alloc_bytes)
+            return result
+
+    def to_prometheus(self):
+        """Volcado en formato de texto de Prometheus (histograma y contadores por etapa)"""
+        name = f"{self.prefix}_stage_seconds"
+        lines = [f"# HELP {name} Tiempo por llamada de cada etapa (inclusivo).",
+                 f"# TYPE {name} histogram"]
+        snapshot = self.snapshot()
+        for stage, stats in snapshot.items():
+            for bound, count in stats['buckets'].items():
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {stats["seconds"]!r}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {stats["count"]}')
+
+        self_name = f"{self.prefix}_stage_self_seconds_total"
+        lines += [f"# HELP {self_name} Tiempo propio de cada etapa, sin las etapas anidadas.",
+                  f"# TYPE {self_name} counter"]
+        lines += [f'{self_name}{{stage="{stage}"}} {stats["self_seconds"]!r}' for stage, stats in snapshot.items()]
+
+        if self.track_allocations:
+            alloc_name = f"{self.prefix}_stage_alloc_peak_bytes"
+            lines += [f"# HELP {alloc_name} Pico de memoria reservada durante una llamada.",
+                      f"# TYPE {alloc_name} gauge"]
+            lines += [f'{alloc_name}{{stage="{stage}"}} {stats["alloc_peak_bytes"]}'
+                      for stage, stats in snapshot.items()]
+        return '\n'.join(lines) + '\n'
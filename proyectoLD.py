@@ -1,91 +1,7 @@
-import numpy as np
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
-import matplotlib
-matplotlib.use('TkAgg')
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-
-# Configuración de rangos de alta precisión
-servicio = ctrl.Antecedent(np.linspace(0, 5, 501), 'servicio')
-comida = ctrl.Antecedent(np.linspace(0, 5, 501), 'comida')
-propina = ctrl.Consequent(np.linspace(0, 15, 1501), 'propina')
-
-# Funciones de membresía para servicio
-servicio['inexistente'] = fuzz.trimf(servicio.universe, [0, 0, 0.001])
-servicio['mediocre'] = fuzz.trapmf(servicio.universe, [0.001, 0.1, 1, 1.5])
-servicio['mala'] = fuzz.trimf(servicio.universe, [0.5, 1.5, 2.5])
-servicio['regular'] = fuzz.trimf(servicio.universe, [1.5, 2.5, 3.5])
-servicio['bueno'] = fuzz.trimf(servicio.universe, [2.5, 3.5, 4.5])
-servicio['excelente'] = fuzz.trapmf(servicio.universe, [3.5, 4.5, 5, 5])
-
-# Funciones de membresía para comida
-comida['inexistente'] = fuzz.trimf(comida.universe, [0, 0, 0.001])
-comida['mediocre'] = fuzz.trapmf(comida.universe, [0.001, 0.1, 1, 1.5])
-comida['mala'] = fuzz.trimf(comida.universe, [0.5, 1.5, 2.5])
-comida['regular'] = fuzz.trimf(comida.universe, [1.5, 2.5, 3.5])
-comida['bueno'] = fuzz.trimf(comida.universe, [2.5, 3.5, 4.5])
-comida['excelente'] = fuzz.trapmf(comida.universe, [3.5, 4.5, 5, 5])
-
-# Configuración manual de las membresías de propina
-propina['muyalta'] = fuzz.trimf(propina.universe, [15, 15, 15])
-propina['alta'] = fuzz.trapmf(propina.universe, [10, 12, 14, 14.99])
-propina['media'] = fuzz.trapmf(propina.universe, [6, 8, 10, 12])
-propina['baja'] = fuzz.trapmf(propina.universe, [2, 4, 6, 8])
-propina['muybaja'] = fuzz.trimf(propina.universe, [0, 0, 0])
-
-# Reglas del sistema (igual que antes)
-rules = [
-    ctrl.Rule(servicio['inexistente'] & comida['inexistente'], propina['muybaja']),
-    ctrl.Rule(servicio['inexistente'] & comida['mediocre'], propina['muybaja']),
-    ctrl.Rule(servicio['inexistente'] & comida['mala'], propina['muybaja']),
-    ctrl.Rule(servicio['inexistente'] & comida['regular'], propina['muybaja']),
-    ctrl.Rule(servicio['inexistente'] & comida['bueno'], propina['muybaja']),
-    ctrl.Rule(servicio['inexistente'] & comida['excelente'], propina['muybaja']),
-    
-    ctrl.Rule(servicio['mediocre'] & comida['inexistente'], propina['muybaja']),
-    ctrl.Rule(servicio['mala'] & comida['inexistente'], propina['muybaja']),
-    ctrl.Rule(servicio['regular'] & comida['inexistente'], propina['muybaja']),
-    ctrl.Rule(servicio['bueno'] & comida['inexistente'], propina['muybaja']),
-    ctrl.Rule(servicio['excelente'] & comida['inexistente'], propina['muybaja']),
-    
-    ctrl.Rule(servicio['mediocre'] & comida['mediocre'], propina['baja']),
-    ctrl.Rule(servicio['mediocre'] & comida['mala'], propina['baja']),
-    ctrl.Rule(servicio['mediocre'] & comida['regular'], propina['baja']),
-    ctrl.Rule(servicio['mediocre'] & comida['bueno'], propina['media']),
-    ctrl.Rule(servicio['mediocre'] & comida['excelente'], propina['media']),
-    
-    ctrl.Rule(servicio['mala'] & comida['mediocre'], propina['baja']),
-    ctrl.Rule(servicio['mala'] & comida['mala'], propina['baja']),
-    ctrl.Rule(servicio['mala'] & comida['regular'], propina['media']),
-    ctrl.Rule(servicio['mala'] & comida['bueno'], propina['media']),
-    ctrl.Rule(servicio['mala'] & comida['excelente'], propina['media']),
-    
-    ctrl.Rule(servicio['regular'] & comida['mediocre'], propina['media']),
-    ctrl.Rule(servicio['regular'] & comida['mala'], propina['media']),
-    ctrl.Rule(servicio['regular'] & comida['regular'], propina['media']),
-    ctrl.Rule(servicio['regular'] & comida['bueno'], propina['alta']),
-    ctrl.Rule(servicio['regular'] & comida['excelente'], propina['alta']),
-    
-    ctrl.Rule(servicio['bueno'] & comida['mediocre'], propina['media']),
-    ctrl.Rule(servicio['bueno'] & comida['mala'], propina['media']),
-    ctrl.Rule(servicio['bueno'] & comida['regular'], propina['alta']),
-    ctrl.Rule(servicio['bueno'] & comida['bueno'], propina['alta']),
-    ctrl.Rule(servicio['bueno'] & comida['excelente'], propina['muyalta']),
-    
-    ctrl.Rule(servicio['excelente'] & comida['mediocre'], propina['alta']),
-    ctrl.Rule(servicio['excelente'] & comida['mala'], propina['alta']),
-    ctrl.Rule(servicio['excelente'] & comida['regular'], propina['muyalta']),
-    ctrl.Rule(servicio['excelente'] & comida['bueno'], propina['muyalta']),
-    ctrl.Rule(servicio['excelente'] & comida['excelente'], propina['muyalta']),
-]
-
-sistema_propina = ctrl.ControlSystem(rules)
-calculador_propina = ctrl.ControlSystemSimulation(sistema_propina)
-calculador_propina.defuzz_method = 'lom'
+import tip_controller
+from tip_controller import compute_tip_explained
 
 class StarRating(tk.Frame):
     def __init__(self, parent, title, *args, **kwargs):
@@ -133,6 +49,11 @@ class StarRating(tk.Frame):
 class PropinaApp(tk.Tk):
     def __init__(self):
         super().__init__()
+        
+        # matplotlib solo se importa al abrir la interfaz
+        import matplotlib
+        matplotlib.use('TkAgg')
+        
         self.title("🌟 Sistema de Propinas Difuso 🌟")
         self.geometry("800x600")
         self.configure(bg='#f0f0f0')
@@ -193,51 +114,44 @@ class PropinaApp(tk.Tk):
         self.setup_graphs(main_frame)
     
     def setup_graphs(self, parent):
-        notebook = ttk.Notebook(parent)
-        notebook.pack(fill=tk.BOTH, expand=True, pady=10)
-        
-        # Pestaña para servicio
-        tab1 = ttk.Frame(notebook)
-        fig1 = Figure(figsize=(5, 3), dpi=100)
-        ax1 = fig1.add_subplot(111)
-        for key in servicio.terms:
-            ax1.plot(servicio.universe, servicio[key].mf, label=key)
-        ax1.legend()
-        ax1.set_title("Membresía de Servicio")
-        
-        canvas1 = FigureCanvasTkAgg(fig1, tab1)
-        canvas1.draw()
-        canvas1.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        from membership_plot import AxesOverlay, FuzzyResultOverlay
         
-        # Pestaña para comida
-        tab2 = ttk.Frame(notebook)
-        fig2 = Figure(figsize=(5, 3), dpi=100)
-        ax2 = fig2.add_subplot(111)
-        for key in comida.terms:
-            ax2.plot(comida.universe, comida[key].mf, label=key)
-        ax2.legend()
-        ax2.set_title("Membresía de Comida")
+        # Variables del controlador (se construye aquí si aún no existía)
+        servicio = tip_controller.servicio
+        comida = tip_controller.comida
+        propina = tip_controller.propina
         
-        canvas2 = FigureCanvasTkAgg(fig2, tab2)
-        canvas2.draw()
-        canvas2.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        
-        # Pestaña para propina
-        tab3 = ttk.Frame(notebook)
-        fig3 = Figure(figsize=(5, 3), dpi=100)
-        ax3 = fig3.add_subplot(111)
-        for key in propina.terms:
-            ax3.plot(propina.universe, propina[key].mf, label=key)
-        ax3.legend()
-        ax3.set_title("Membresía de Propina")
-        
-        canvas3 = FigureCanvasTkAgg(fig3, tab3)
-        canvas3.draw()
-        canvas3.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        notebook = ttk.Notebook(parent)
+        notebook.pack(fill=tk.BOTH, expand=True, pady=10)
         
-        notebook.add(tab1, text="Servicio")
-        notebook.add(tab2, text="Comida")
-        notebook.add(tab3, text="Propina")
+        # Una pestaña por variable; las curvas se dibujan una sola vez
+        overlays = []
+        for variable, tab_text, title in [(servicio, "Servicio", "Membresía de Servicio"),
+                                          (comida, "Comida", "Membresía de Comida"),
+                                          (propina, "Propina", "Membresía de Propina")]:
+            tab = ttk.Frame(notebook)
+            fig = Figure(figsize=(5, 3), dpi=100)
+            ax = fig.add_subplot(111)
+            lines = [ax.plot(variable.universe, variable[key].mf, label=key)[0] for key in variable.terms]
+            ax.legend()
+            ax.set_title(title)
+            
+            canvas = FigureCanvasTkAgg(fig, tab)
+            overlays.append(AxesOverlay(canvas, ax))
+            canvas.draw()
+            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            notebook.add(tab, text=tab_text)
+        
+        # Superposición dinámica: entradas, consecuentes recortados, agregado y propina
+        self.result_overlay = FuzzyResultOverlay(overlays[:2], overlays[2], propina.universe,
+                                                 [propina[key].mf for key in propina.terms],
+                                                 [line.get_color() for line in lines])
+    
+    def update_graphs(self, servicio_val, comida_val, tip, strengths):
+        """Superpone el resultado sobre las gráficas (solo se repinta la superposición)"""
+        self.result_overlay.update((servicio_val, comida_val), strengths, tip)
     
     def get_tip_category(self, tip_value):
         if tip_value <= 1:
@@ -256,18 +170,17 @@ class PropinaApp(tk.Tk):
             servicio_val = self.servicio_rating.value.get()
             comida_val = self.comida_rating.value.get()
             
+            # Propina y cortes de los consecuentes en un solo cálculo
+            tip, strengths = compute_tip_explained(servicio_val, comida_val)
+            
             # Caso especial [0,0]
             if servicio_val == 0 and comida_val == 0:
                 self.propina_display.config(text="0.00%", foreground='#E74C3C')
                 self.category_display.config(text="(Muy baja)")
+                self.update_graphs(servicio_val, comida_val, 0.0, strengths)
                 return
                 
             # Resto de casos
-            calculador_propina.input['servicio'] = servicio_val
-            calculador_propina.input['comida'] = comida_val
-            calculador_propina.compute()
-            
-            tip = calculador_propina.output['propina']
             category = self.get_tip_category(tip)
             
             # Actualizar displays
@@ -286,6 +199,8 @@ class PropinaApp(tk.Tk):
             self.propina_display.config(foreground=color)
             self.category_display.config(foreground=color)
             
+            self.update_graphs(servicio_val, comida_val, tip, strengths)
+            
         except Exception as e:
             self.propina_display.config(text="Error", foreground='#E74C3C')
             self.category_display.config(text="(Verifique los valores)")
@@ -1,153 +1,78 @@
+import queue
+import threading
 import numpy as np
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
-import matplotlib
-matplotlib.use('TkAgg')
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
+from fuzzy_system import FuzzySystem, get_tip_category
 
-class FuzzySystem:
-    def __init__(self):
-        # Definición de los universos de discurso
-        self.servicio_universe = np.linspace(0, 5, 501)
-        self.comida_universe = np.linspace(0, 5, 501)
-        self.propina_universe = np.linspace(0, 15, 1501)
-        
-        # Funciones de membresía para servicio y comida
-        self.servicio_terms = {
-            'mediocre': self.trapmf(self.servicio_universe, [0, 0, 1, 1.5]),
-            'mala': self.trimf(self.servicio_universe, [0.5, 1.5, 2.5]),
-            'regular': self.trimf(self.servicio_universe, [1.5, 2.5, 3.5]),
-            'bueno': self.trimf(self.servicio_universe, [2.5, 3.5, 4.5]),
-            'excelente': self.trapmf(self.servicio_universe, [3.5, 4.5, 5, 5])
-        }
-        
-        self.comida_terms = {
-            'mediocre': self.trapmf(self.comida_universe, [0, 0, 1, 1.5]),
-            'mala': self.trimf(self.comida_universe, [0.5, 1.5, 2.5]),
-            'regular': self.trimf(self.comida_universe, [1.5, 2.5, 3.5]),
-            'bueno': self.trimf(self.comida_universe, [2.5, 3.5, 4.5]),
-            'excelente': self.trapmf(self.comida_universe, [3.5, 4.5, 5, 5])
-        }
-        
-        # Funciones de membresía para propina
-        self.propina_terms = {
-            'cero': self.singletonmf(self.propina_universe, 0),
-            'muybaja': self.trapmf(self.propina_universe, [0, 0, 2, 4]),
-            'baja': self.trapmf(self.propina_universe, [2, 4, 6, 8]),
-            'media': self.trapmf(self.propina_universe, [6, 8, 10, 12]),
-            'alta': self.trapmf(self.propina_universe, [10, 12, 14, 14.99]),
-            'muyalta': self.singletonmf(self.propina_universe, 15)
-        }
-        
-        # Reglas del sistema
-        self.rules = self.create_rules()
-    
-    def trimf(self, x, params):
-        """Función triangular de membresía"""
-        a, b, c = params
-        y = np.zeros(len(x))
-        y[(a <= x) & (x <= b)] = (x[(a <= x) & (x <= b)] - a) / (b - a)
-        y[(b <= x) & (x <= c)] = (c - x[(b <= x) & (x <= c)]) / (c - b)
-        return y
-    
-    def trapmf(self, x, params):
-        """Función trapezoidal de membresía"""
-        a, b, c, d = params
-        y = np.zeros(len(x))
-        y[(a <= x) & (x < b)] = (x[(a <= x) & (x < b)] - a) / (b - a)
-        y[(b <= x) & (x <= c)] = 1
-        y[(c < x) & (x <= d)] = (d - x[(c < x) & (x <= d)]) / (d - c)
-        return y
-    
-    def singletonmf(self, x, value):
-        """Función singleton de membresía"""
-        y = np.zeros(len(x))
-        y[x == value] = 1
-        return y
+# Modo en vivo: espera tras el último movimiento del slider y sondeo del resultado (ms)
+LIVE_DEBOUNCE_MS = 80
+LIVE_POLL_MS = 20
+
+# Paleta de colores por categoría
+TIP_COLORS = {
+    "Muy baja": '#E74C3C',  # Rojo vibrante
+    "Baja": '#E67E22',      # Naranja
+    "Media": '#F1C40F',     # Amarillo
+    "Alta": '#2ECC71',      # Verde
+    "Muy alta": '#9B59B6'   # Púrpura (reemplaza el azul)
+}
+
+class LiveTipWorker:
+    """Hilo de fondo que calcula solo la última propina pedida.
+
+    submit() sustituye la petición pendiente, así que las anteriores que aún
+    no han empezado se descartan; latest_result() ignora además los resultados
+    de peticiones que ya no son la última. Tkinter no es seguro entre hilos:
+    la interfaz recoge los resultados sondeando desde su propio bucle.
+    """
+    def __init__(self, compute_fn):
+        self.compute_fn = compute_fn
+        self.condition = threading.Condition()
+        self.pending = None
+        self.generation = 0
+        self.closed = False
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
     
-    def create_rules(self):
-        """Crea las reglas del sistema difuso"""
-        rules = []
-        
-        # Mapeo de categorías a índices para acceder a las funciones de membresía
-        categories = ['mediocre', 'mala', 'regular', 'bueno', 'excelente']
-        tip_categories = ['muybaja', 'baja', 'media', 'alta', 'muyalta']
-        
-        # Matriz de reglas (servicio x comida -> propina)
-        rule_matrix = [
-            # Mediocre  Mala    Regular Bueno   Excelente
-            ['muybaja', 'muybaja', 'muybaja', 'muybaja', 'baja'],     # Mediocre
-            ['muybaja', 'muybaja', 'muybaja', 'baja', 'media'],      # Mala
-            ['muybaja', 'muybaja', 'baja', 'media', 'alta'],        # Regular
-            ['muybaja', 'baja', 'media', 'alta', 'muyalta'],        # Bueno
-            ['baja', 'media', 'alta', 'muyalta', 'muyalta']         # Excelente
-        ]
-        
-        # Convertir matriz en lista de reglas
-        for i, servicio_cat in enumerate(categories):
-            for j, comida_cat in enumerate(categories):
-                propina_cat = rule_matrix[i][j]
-                rules.append({
-                    'servicio': servicio_cat,
-                    'comida': comida_cat,
-                    'propina': propina_cat
-                })
-        
-        # Regla especial para 0,0
-        rules.append({
-            'servicio': 'mediocre',
-            'comida': 'mediocre',
-            'propina': 'cero'
-        })
-        
-        return rules
+    def submit(self, servicio_val, comida_val):
+        with self.condition:
+            self.generation += 1
+            self.pending = (self.generation, servicio_val, comida_val)
+            self.condition.notify()
     
-    def fuzzify(self, value, terms, universe):
-        """Fuzzificación: calcula el grado de membresía para cada término"""
-        membership = {}
-        for term, mf in terms.items():
-            membership[term] = np.interp(value, universe, mf)
-        return membership
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                generation, servicio_val, comida_val = self.pending
+                self.pending = None
+            try:
+                result = self.compute_fn(servicio_val, comida_val)
+            except Exception as e:
+                result = e
+            self.results.put((generation, result))
     
-    def infer(self, servicio_val, comida_val):
-        """Inferencia difusa: aplica las reglas y calcula la salida agregada"""
-        # Paso 1: Fuzzificación de las entradas
-        servicio_fuzzy = self.fuzzify(servicio_val, self.servicio_terms, self.servicio_universe)
-        comida_fuzzy = self.fuzzify(comida_val, self.comida_terms, self.comida_universe)
-        
-        # Paso 2: Aplicar reglas y agregar resultados
-        aggregated = np.zeros(len(self.propina_universe))
-        
-        for rule in self.rules:
-            # Obtener grados de membresía para los antecedentes
-            servicio_degree = servicio_fuzzy[rule['servicio']]
-            comida_degree = comida_fuzzy[rule['comida']]
-            
-            # Aplicar operador AND (usamos mínimo)
-            firing_strength = min(servicio_degree, comida_degree)
-            
-            # Recortar la función de membresía de consecuencia y agregar
-            consequence_mf = np.minimum(firing_strength, self.propina_terms[rule['propina']])
-            aggregated = np.maximum(aggregated, consequence_mf)
-        
-        return aggregated
+    def latest_result(self):
+        """(resultado,) de la última petición si ya está lista; None si no"""
+        latest = None
+        while True:
+            try:
+                generation, result = self.results.get_nowait()
+            except queue.Empty:
+                return latest
+            with self.condition:
+                if generation == self.generation:
+                    latest = (result,)
     
-    def defuzzify(self, aggregated_output, method='centroid'):
-        """Defuzzificación: calcula un valor nítido a partir de la salida difusa"""
-        if method == 'centroid':
-            # Método del centroide
-            if np.sum(aggregated_output) == 0:
-                return 0
-            return np.sum(self.propina_universe * aggregated_output) / np.sum(aggregated_output)
-        elif method == 'lom':
-            # Last of Maximum
-            max_val = np.max(aggregated_output)
-            max_indices = np.where(aggregated_output == max_val)[0]
-            return self.propina_universe[max_indices[-1]]
-        else:
-            raise ValueError("Método de defuzzificación no soportado")
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
 
 class StarSlider(ttk.Frame):
     def __init__(self, parent, text, variable, from_, to):
@@ -202,6 +127,10 @@ class PropinaApp(tk.Tk):
     def __init__(self):
         super().__init__()
         
+        # matplotlib solo se importa al abrir la interfaz
+        import matplotlib
+        matplotlib.use('TkAgg')
+        
         self.tk.call('tk', 'scaling', 2.0)
         self.title("🌟 Sistema de Propinas Difusas 🌟")
         self.geometry("1000x800")
@@ -221,6 +150,17 @@ class PropinaApp(tk.Tk):
         self.servicio_var = tk.DoubleVar(value=2.5)
         self.comida_var = tk.DoubleVar(value=2.5)
         
+        # Modo en vivo: recálculo en segundo plano al mover los sliders
+        self.live_var = tk.BooleanVar(value=False)
+        self.live_worker = LiveTipWorker(self.evaluate)
+        self._live_job = None
+        self._poll_job = None
+        self._shown = None
+        self._shown_activations = None
+        self.servicio_var.trace_add('write', self.schedule_live_update)
+        self.comida_var.trace_add('write', self.schedule_live_update)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        
         self.create_widgets()
         
     def create_widgets(self):
@@ -255,6 +195,9 @@ class PropinaApp(tk.Tk):
         ttk.Button(button_frame, text="📋 Ver Reglas de Inferencia", 
                   command=self.show_rules).pack(side=tk.LEFT, padx=10)
         
+        ttk.Checkbutton(button_frame, text="Actualización en vivo", variable=self.live_var,
+                        command=self.schedule_live_update).pack(side=tk.LEFT, padx=10)
+        
         # Resultado
         result_frame = ttk.Frame(main_frame)
         result_frame.pack(pady=20)
@@ -270,10 +213,24 @@ class PropinaApp(tk.Tk):
                                         font=('Helvetica', 14), foreground='#666666')
         self.category_display.pack()
         
+        # Panel de activación de reglas: (regla, fuerza) de las reglas que se activan
+        rules_frame = ttk.Frame(main_frame)
+        rules_frame.pack(fill=tk.X)
+        ttk.Label(rules_frame, text="Reglas activadas:").pack(anchor='w')
+        self.rules_panel = ttk.Treeview(rules_frame, columns=('fuerza',), height=4, selectmode='browse')
+        self.rules_panel.heading('#0', text='Regla')
+        self.rules_panel.heading('fuerza', text='Fuerza')
+        self.rules_panel.column('fuerza', width=100, anchor='center')
+        self.rules_panel.pack(fill=tk.X)
+        self.rules_panel.bind('<<TreeviewSelect>>', self.on_rule_selected)
+        
         # Gráficos
         graph_frame = ttk.Frame(main_frame)
         graph_frame.pack(expand=True, fill=tk.BOTH, pady=20)
         
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        
         self.fig = Figure(figsize=(10, 4), dpi=100, facecolor='#f5f5f5')
         self.canvas = FigureCanvasTkAgg(self.fig, master=graph_frame)
         self.canvas.get_tk_widget().pack(expand=True, fill=tk.BOTH)
@@ -284,49 +241,102 @@ class PropinaApp(tk.Tk):
             servicio_val = round(self.servicio_var.get(), 2)
             comida_val = round(self.comida_var.get(), 2)
             
-            # Inferencia difusa
-            aggregated = self.fuzzy_system.infer(servicio_val, comida_val)
-            
-            # Defuzzificación
-            tip = self.fuzzy_system.defuzzify(aggregated, method='lom')
-            category = self.get_tip_category(tip)
-            
-            # Actualizar displays
-            self.propina_display.config(text=f"{tip:.2f}%")
-            self.category_display.config(text=f"({category})")
-            
-            # Nueva paleta de colores mejorada
-            colors = {
-                "Muy baja": '#E74C3C',  # Rojo vibrante
-                "Baja": '#E67E22',      # Naranja
-                "Media": '#F1C40F',     # Amarillo
-                "Alta": '#2ECC71',      # Verde
-                "Muy alta": '#9B59B6'   # Púrpura (reemplaza el azul)
-            }
-            color = colors.get(category, '#2ECC71')
-            
-            self.propina_display.config(foreground=color)
-            self.category_display.config(foreground=color)
-            
+            result = self.evaluate(servicio_val, comida_val)
         except Exception as e:
-            self.propina_display.config(text="Error", foreground='#E74C3C')
-            self.category_display.config(text="(Verifique los valores)")
+            result = e
+        self.show_result(result)
+    
+    def evaluate(self, servicio_val, comida_val):
+        """Propina y reglas activadas (se llama también desde el hilo en vivo)"""
+        # La propina sale de la caché del sistema (TipCache)
+        tip = self.fuzzy_system.compute(servicio_val, comida_val, method='lom')
+        # Las activaciones solo rellenan el panel; se guardan en la misma caché, que
+        # se vacía al cambiar funciones de membresía o reglas
+        activations = self.fuzzy_system.cache.get_or_compute(
+            servicio_val, comida_val, 'explain',
+            lambda s, c: self.fuzzy_system.infer(s, c, explain=True)[1])
+        return servicio_val, comida_val, tip, activations
+    
+    def show_result(self, result):
+        """Muestra la propina y superpone el resultado sobre las gráficas"""
+        if isinstance(result, Exception):
+            self.show_tip(result)
+            return
+        servicio_val, comida_val, tip, activations = result
+        self.show_tip(tip)
+        self.show_activations(activations)
+        strengths = self.fuzzy_system.activation_strengths(activations)
+        self.result_overlay.update((servicio_val, comida_val), strengths, tip)
+    
+    def show_activations(self, activations):
+        """Rellena el panel de reglas; si las activaciones no cambian no se toca"""
+        if self._shown_activations is not None and np.array_equal(activations, self._shown_activations):
+            return
+        self._shown_activations = activations
+        
+        self.rules_panel.delete(*self.rules_panel.get_children())
+        for rule, strength in activations:
+            self.rules_panel.insert('', tk.END, iid=str(rule), text=self.fuzzy_system.describe_rule(rule),
+                                    values=(f"{strength:.2f}",))
+    
+    def on_rule_selected(self, event):
+        """Resalta el consecuente recortado de la regla elegida (se calcula solo ahora)"""
+        selection = self.rules_panel.selection()
+        if not selection:
+            self.result_overlay.highlight(None)
+            return
+        rule = int(selection[0])
+        activations = self._shown_activations
+        strength = activations['strength'][activations['rule'] == rule][0]
+        self.result_overlay.highlight(self.fuzzy_system.rule_output(rule, strength))
+    
+    def show_tip(self, tip):
+        """Actualiza los displays; si el resultado no ha cambiado no se redibujan"""
+        if isinstance(tip, Exception):
+            shown = ("Error", '#E74C3C', "(Verifique los valores)", None)
+        else:
+            category = self.get_tip_category(tip)
+            color = TIP_COLORS.get(category, '#2ECC71')
+            shown = (f"{tip:.2f}%", color, f"({category})", color)
+        if shown == self._shown:
+            return
+        self._shown = shown
+        
+        text, color, category_text, category_color = shown
+        self.propina_display.config(text=text, foreground=color)
+        self.category_display.config(text=category_text)
+        if category_color is not None:
+            self.category_display.config(foreground=category_color)
+    
+    def schedule_live_update(self, *args):
+        """Reinicia la espera en cada movimiento: solo se calcula cuando el slider se detiene"""
+        if self._live_job is not None:
+            self.after_cancel(self._live_job)
+            self._live_job = None
+        if self.live_var.get():
+            self._live_job = self.after(LIVE_DEBOUNCE_MS, self.request_live_tip)
+    
+    def request_live_tip(self):
+        self._live_job = None
+        self.live_worker.submit(round(self.servicio_var.get(), 2), round(self.comida_var.get(), 2))
+        if self._poll_job is None:
+            self._poll_job = self.after(LIVE_POLL_MS, self.poll_live_tip)
+    
+    def poll_live_tip(self):
+        """Muestra el resultado de la última petición en cuanto esté listo"""
+        result = self.live_worker.latest_result()
+        if result is None:
+            self._poll_job = self.after(LIVE_POLL_MS, self.poll_live_tip)
+            return
+        self._poll_job = None
+        self.show_result(result[0])
+    
+    def on_close(self):
+        self.live_worker.close()
+        self.destroy()
     
     def get_tip_category(self, value):
-        # Usamos un enfoque con diccionario para evitar if-elif anidados
-        categories = [
-            (15, "Muy alta"),
-            (14, "Alta"),
-            (12, "Media"),
-            (8, "Baja"),
-            (1, "Muy baja"),
-            (0, "Ninguna")
-        ]
-        
-        for threshold, category in categories:
-            if value > threshold:
-                return category
-        return "Ninguna"
+        return get_tip_category(value)
     
     def show_rules(self):
         rules_window = tk.Toplevel(self)
@@ -390,6 +400,10 @@ class PropinaApp(tk.Tk):
         ttk.Button(rules_window, text="Cerrar", command=rules_window.destroy).pack(pady=10)
     
     def plot_membership_functions(self):
+        """Dibuja una sola vez las curvas de membresía; los resultados se superponen con blitting"""
+        import matplotlib
+        from membership_plot import AxesOverlay, FuzzyResultOverlay
+        
         self.fig.clf()
         
         # Configurar estilo de los gráficos
@@ -403,39 +417,43 @@ class PropinaApp(tk.Tk):
             'axes.titleweight': 'bold'
         }
         
-        for param, value in plt_style.items():
-            matplotlib.rcParams[param] = value
-        
-        # Gráfico de servicio
-        ax1 = self.fig.add_subplot(131)
-        colors = ['#ff6b6b', '#ffa502', '#feca57', '#1dd1a1', '#2e86de']
-        for i, (name, mf) in enumerate(self.fuzzy_system.servicio_terms.items()):
-            ax1.plot(self.fuzzy_system.servicio_universe, mf, label=name, color=colors[i], linewidth=2)
-        ax1.set_title('Servicio')
-        ax1.legend(framealpha=0.9, facecolor='white')
-        ax1.set_ylim(0, 1.1)
-        ax1.set_facecolor('#f8f9fa')
-        
-        # Gráfico de comida
-        ax2 = self.fig.add_subplot(132)
-        for i, (name, mf) in enumerate(self.fuzzy_system.comida_terms.items()):
-            ax2.plot(self.fuzzy_system.comida_universe, mf, label=name, color=colors[i], linewidth=2)
-        ax2.set_title('Comida')
-        ax2.legend(framealpha=0.9, facecolor='white')
-        ax2.set_ylim(0, 1.1)
-        ax2.set_facecolor('#f8f9fa')
-        
-        # Gráfico de propina
-        ax3 = self.fig.add_subplot(133)
-        propina_colors = ['#ff0000', '#ff6b6b', '#ff9f43', '#feca57', '#2ecc71', '#1a237e']
-        for i, (name, mf) in enumerate(self.fuzzy_system.propina_terms.items()):
-            ax3.plot(self.fuzzy_system.propina_universe, mf, label=name, color=propina_colors[i], linewidth=2)
-        ax3.set_title('Propina')
-        ax3.legend(framealpha=0.9, facecolor='white')
-        ax3.set_ylim(0, 1.1)
-        ax3.set_facecolor('#f8f9fa')
-        
-        self.fig.tight_layout(pad=3.0)
+        # El estilo solo se aplica a estos gráficos, sin tocar los rcParams globales
+        with matplotlib.rc_context(plt_style):
+            # Gráfico de servicio
+            ax1 = self.fig.add_subplot(131)
+            colors = ['#ff6b6b', '#ffa502', '#feca57', '#1dd1a1', '#2e86de']
+            for i, (name, mf) in enumerate(self.fuzzy_system.servicio_terms.items()):
+                ax1.plot(self.fuzzy_system.servicio_universe, mf, label=name, color=colors[i], linewidth=2)
+            ax1.set_title('Servicio')
+            ax1.legend(framealpha=0.9, facecolor='white')
+            ax1.set_ylim(0, 1.1)
+            ax1.set_facecolor('#f8f9fa')
+            
+            # Gráfico de comida
+            ax2 = self.fig.add_subplot(132)
+            for i, (name, mf) in enumerate(self.fuzzy_system.comida_terms.items()):
+                ax2.plot(self.fuzzy_system.comida_universe, mf, label=name, color=colors[i], linewidth=2)
+            ax2.set_title('Comida')
+            ax2.legend(framealpha=0.9, facecolor='white')
+            ax2.set_ylim(0, 1.1)
+            ax2.set_facecolor('#f8f9fa')
+            
+            # Gráfico de propina
+            ax3 = self.fig.add_subplot(133)
+            propina_colors = ['#ff0000', '#ff6b6b', '#ff9f43', '#feca57', '#2ecc71', '#1a237e']
+            for i, (name, mf) in enumerate(self.fuzzy_system.propina_terms.items()):
+                ax3.plot(self.fuzzy_system.propina_universe, mf, label=name, color=propina_colors[i], linewidth=2)
+            ax3.set_title('Propina')
+            ax3.legend(framealpha=0.9, facecolor='white')
+            ax3.set_ylim(0, 1.1)
+            ax3.set_facecolor('#f8f9fa')
+            
+            self.fig.tight_layout(pad=3.0)
+        
+        # Superposición dinámica: entradas, consecuentes recortados, agregado y propina
+        overlays = [AxesOverlay(self.canvas, ax) for ax in (ax1, ax2, ax3)]
+        self.result_overlay = FuzzyResultOverlay(overlays[:2], overlays[2], self.fuzzy_system.propina_universe,
+                                                 self.fuzzy_system.propina_matrix, propina_colors)
         self.canvas.draw()
 
 if __name__ == "__main__":
@@ -0,0 +1,200 @@
+"""Cálculo masivo de propinas a partir de un fichero CSV o Parquet.
+
+Lee el fichero por bloques de tamaño fijo, calcula las propinas de cada bloque
+con FuzzySystem.compute_batch y escribe el bloque (columnas originales más
+'propina' y 'categoria') antes de leer el siguiente, así que la memoria no
+depende del tamaño del fichero. Con --workers los bloques se reparten entre
+procesos (ParallelInference, con el modelo en memoria compartida), manteniendo
+acotado el número de bloques en vuelo y el orden de salida.
+
+Las filas con una valoración vacía, no numérica, no finita o fuera de 0-5 no se
+puntúan: se escriben con la propina y la categoría vacías (nulas en Parquet) y
+se informa de su número de fila (1 es la primera fila de datos).
+
+Parquet requiere pyarrow.
+
+Uso: python score_tips.py historico.csv propinas.csv --chunk-size 50000 --workers 4
+"""
+import argparse
+import collections
+import csv
+import sys
+
+import numpy as np
+
+from fuzzy_system import DEFUZZ_METHODS, FuzzySystem, get_tip_categories
+from parallel_inference import ParallelInference
+
+
+def is_parquet(path):
+    return str(path).lower().endswith(('.parquet', '.pq'))
+
+
+def read_csv_chunks(path, chunk_size, servicio_col, comida_col):
+    """Genera (cabecera, filas, servicios, comidas) por bloques"""
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        servicio_idx = header.index(servicio_col)
+        comida_idx = header.index(comida_col)
+        rows = []
+        for row in reader:
+            rows.append(row)
+            if len(rows) == chunk_size:
+                yield header, rows, *_csv_inputs(rows, servicio_idx, comida_idx)
+                rows = []
+        if rows:
+            yield header, rows, *_csv_inputs(rows, servicio_idx, comida_idx)
+
+
+def _csv_inputs(rows, servicio_idx, comida_idx):
+    servicio_vals = np.array([_parse_cell(row, servicio_idx) for row in rows])
+    comida_vals = np.array([_parse_cell(row, comida_idx) for row in rows])
+    return servicio_vals, comida_vals
+
+
+def _parse_cell(row, index):
+    """Valor de una celda; NaN si falta o no es un número (la fila se marca como no válida)"""
+    try:
+        return float(row[index])
+    except (ValueError, IndexError):
+        return np.nan
+
+
+def valid_inputs(servicio_vals, comida_vals):
+    """Filas con las dos valoraciones finitas y dentro de 0-5"""
+    valid = np.ones(len(servicio_vals), dtype=bool)
+    for values in (servicio_vals, comida_vals):
+        with np.errstate(invalid='ignore'):
+            valid &= np.isfinite(values) & (values >= 0) & (values <= 5)
+    return valid
+
+
+def _scored(valid, valid_tips):
+    """Propinas y categorías de un bloque completo: NaN y '' en las filas no válidas"""
+    tips = np.full(len(valid), np.nan)
+    tips[valid] = valid_tips
+    return tips, np.where(valid, get_tip_categories(tips), '')
+
+
+def read_parquet_chunks(path, chunk_size, servicio_col, comida_col):
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size):
+        servicio_vals = batch.column(servicio_col).to_numpy(zero_copy_only=False).astype(float)
+        comida_vals = batch.column(comida_col).to_numpy(zero_copy_only=False).astype(float)
+        yield batch.schema, batch, servicio_vals, comida_vals
+
+
+class CsvChunkWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.header_written = False
+
+    def write(self, header, rows, tips, categories):
+        if not self.header_written:
+            self.writer.writerow(header + ['propina', 'categoria'])
+            self.header_written = True
+        self.writer.writerows(row + ['' if np.isnan(tip) else f"{tip:.2f}", category]
+                              for row, tip, category in zip(rows, tips, categories))
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetChunkWriter:
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+
+    def write(self, schema, batch, tips, categories):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_batches([batch])
+        table = table.append_column('propina', pa.array(tips, mask=np.isnan(tips)))
+        table = table.append_column('categoria', pa.array([category or None for category in categories],
+                                                          type=pa.string()))
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def score_file(input_path, output_path, chunk_size=50000, method='lom', workers=1,
+               servicio_col='servicio', comida_col='comida'):
+    """Calcula las propinas de input_path y las escribe en output_path.
+
+    Devuelve (nº de filas, números de las filas no válidas).
+    """
+    if is_parquet(input_path) != is_parquet(output_path):
+        raise ValueError("La entrada y la salida deben tener el mismo formato (CSV o Parquet)")
+    read_chunks = read_parquet_chunks if is_parquet(input_path) else read_csv_chunks
+    writer = ParquetChunkWriter(output_path) if is_parquet(output_path) else CsvChunkWriter(output_path)
+    chunks = read_chunks(input_path, chunk_size, servicio_col, comida_col)
+    total = 0
+    invalid_rows = []
+    try:
+        if workers <= 1:
+            fuzzy_system = FuzzySystem()
+            for header, payload, servicio_vals, comida_vals in chunks:
+                valid = valid_inputs(servicio_vals, comida_vals)
+                invalid_rows.extend(total + 1 + np.flatnonzero(~valid))
+                tips, categories = _scored(valid, fuzzy_system.compute_batch(servicio_vals[valid],
+                                                                             comida_vals[valid], method))
+                writer.write(header, payload, tips, categories)
+                total += len(tips)
+        else:
+            # Como mucho 2 bloques en vuelo por trabajador; se escriben en orden de lectura
+            with ParallelInference(FuzzySystem(), workers) as parallel:
+                in_flight = collections.deque()
+                read = 0
+                for header, payload, servicio_vals, comida_vals in chunks:
+                    valid = valid_inputs(servicio_vals, comida_vals)
+                    invalid_rows.extend(read + 1 + np.flatnonzero(~valid))
+                    read += len(valid)
+                    future = parallel.submit(servicio_vals[valid], comida_vals[valid], method)
+                    in_flight.append((header, payload, valid, future))
+                    if len(in_flight) >= 2 * workers:
+                        total += _write_next(writer, in_flight)
+                while in_flight:
+                    total += _write_next(writer, in_flight)
+    finally:
+        writer.close()
+    return total, [int(row) for row in invalid_rows]
+
+
+def _write_next(writer, in_flight):
+    header, payload, valid, future = in_flight.popleft()
+    tips, categories = _scored(valid, future.result())
+    writer.write(header, payload, tips, categories)
+    return len(tips)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cálculo masivo de propinas (CSV o Parquet)")
+    parser.add_argument('input', help="fichero de entrada .csv o .parquet")
+    parser.add_argument('output', help="fichero de salida .csv o .parquet")
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--method', default='lom', choices=DEFUZZ_METHODS)
+    parser.add_argument('--workers', type=int, default=1, help="procesos en paralelo")
+    parser.add_argument('--servicio-col', default='servicio')
+    parser.add_argument('--comida-col', default='comida')
+    args = parser.parse_args()
+
+    total, invalid_rows = score_file(args.input, args.output, args.chunk_size, args.method, args.workers,
+                                     args.servicio_col, args.comida_col)
+    print(f"{total} filas procesadas")
+    if invalid_rows:
+        shown = ', '.join(map(str, invalid_rows[:20])) + (', ...' if len(invalid_rows) > 20 else '')
+        print(f"{len(invalid_rows)} filas sin propina por valoraciones vacías, no numéricas o fuera de 0-5: "
+              f"{shown}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
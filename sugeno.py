@@ -0,0 +1,180 @@
+"""Inferencia Takagi-Sugeno sobre los antecedentes y reglas de un FuzzySystem.
+
+Cada regla concluye una función de las entradas, z = p0 + p1*servicio +
+p2*comida (orden cero si p1 = p2 = 0). La propina es la media de las z
+ponderada por la fuerza de cada regla, así que no hace falta universo de
+salida ni defuzzificación. sharpness eleva las fuerzas a esa potencia antes de
+ponderar: con 1 es el Sugeno clásico, y con valores mayores domina la regla
+más fuerte, como en 'lom'.
+
+fit_sugeno ajusta las constantes por mínimos cuadrados para reproducir las
+propinas Mamdani ('lom' por defecto) sobre una rejilla de entradas. 'lom'
+salta donde cambia el término dominante (y en los empates elige el de más a
+la derecha), algo que ninguna media ponderada continua reproduce. Por eso la
+tolerancia se exige sobre un cuantil del error (coverage) y el informe da
+también el error máximo.
+
+Uso: python sugeno.py --tolerance 1.0 --coverage 0.95 --json sugeno.json
+"""
+import argparse
+import json
+
+import numpy as np
+
+from bench_common import input_grid, time_per_call
+from fuzzy_system import FuzzySystem
+
+
+class SugenoSystem:
+    """Sugeno de orden cero o uno que comparte términos y reglas con un FuzzySystem"""
+
+    def __init__(self, fuzzy_system, consequents=None, sharpness=1.0):
+        """consequents es un array (reglas x 3) con (p0, p1, p2) de cada regla.
+
+        Por defecto cada regla concluye el extremo derecho de la meseta de su
+        término de propina (su 'lom' a altura 1).
+        """
+        self.fuzzy_system = fuzzy_system
+        if consequents is None:
+            levels = fuzzy_system.propina_params[:, 2]
+            consequents = np.zeros((len(fuzzy_system.rule_propina), 3))
+            consequents[:, 0] = levels[fuzzy_system.rule_propina]
+        self.consequents = np.asarray(consequents, dtype=float)
+        if self.consequents.shape != (len(fuzzy_system.rule_propina), 3):
+            raise ValueError("Se espera un consecuente (p0, p1, p2) por regla")
+        self.sharpness = sharpness
+
+    @classmethod
+    def from_levels(cls, fuzzy_system, levels, sharpness=1.0):
+        """Orden cero con una constante por término de propina ({término: valor})"""
+        constants = np.array([levels[name] for name in fuzzy_system.propina_names], dtype=float)
+        consequents = np.zeros((len(fuzzy_system.rule_propina), 3))
+        consequents[:, 0] = constants[fuzzy_system.rule_propina]
+        return cls(fuzzy_system, consequents, sharpness)
+
+    @property
+    def order(self):
+        return 0 if not self.consequents[:, 1:].any() else 1
+
+    def rule_weights(self, servicio_vals, comida_vals):
+        """Pesos de cada regla (reglas x N): fuerza de activación elevada a sharpness"""
+        firing = self.fuzzy_system.firing_strengths(servicio_vals, comida_vals)
+        return firing if self.sharpness == 1 else firing ** self.sharpness
+
+    def rule_outputs(self, servicio_vals, comida_vals):
+        """Salida de cada regla (reglas x N)"""
+        p0, p1, p2 = self.consequents.T
+        return (p0[:, np.newaxis] + p1[:, np.newaxis] * servicio_vals
+                + p2[:, np.newaxis] * comida_vals)
+
+    def compute(self, servicio_val, comida_val):
+        """Propina de un par de entradas (0 si no se activa ninguna regla)"""
+        weights = self.rule_weights(float(servicio_val), float(comida_val))
+        total = weights.sum()
+        if total == 0:
+            return 0.0
+        p0, p1, p2 = self.consequents.T
+        return float(weights @ (p0 + p1 * servicio_val + p2 * comida_val) / total)
+
+    def compute_batch(self, servicio_vals, comida_vals):
+        """Propinas de N entradas en una llamada"""
+        servicio_vals = np.atleast_1d(np.asarray(servicio_vals, dtype=float))
+        comida_vals = np.atleast_1d(np.asarray(comida_vals, dtype=float))
+        if servicio_vals.shape != comida_vals.shape:
+            raise ValueError("Las entradas deben tener la misma longitud")
+        weights = self.rule_weights(servicio_vals, comida_vals)
+        total = weights.sum(axis=0)
+        weighted = np.sum(weights * self.rule_outputs(servicio_vals, comida_vals), axis=0)
+        return np.where(total == 0, 0, weighted / np.where(total == 0, 1, total))
+
+
+def design_matrix(fuzzy_system, servicio_vals, comida_vals, order, sharpness):
+    """Matriz de mínimos cuadrados: pesos normalizados (N x reglas), por 1, servicio y comida en orden 1"""
+    weights = SugenoSystem(fuzzy_system, sharpness=sharpness).rule_weights(servicio_vals, comida_vals).T
+    total = weights.sum(axis=1, keepdims=True)
+    normalized = weights / np.where(total == 0, 1, total)
+    if order == 0:
+        return normalized
+    return np.hstack([normalized, normalized * servicio_vals[:, np.newaxis],
+                      normalized * comida_vals[:, np.newaxis]])
+
+
+def fit_sugeno(fuzzy_system, tolerance=1.0, coverage=0.95, method='lom', grid_step=0.05,
+               orders=(0, 1), sharpness_values=(1, 2, 4, 8, 16, 32)):
+    """Sugeno más sencillo cuyo error frente a las propinas Mamdani cumple la tolerancia.
+
+    Se prueban los órdenes de menor a mayor y, en cada uno, las sharpness de
+    menor a mayor. Se acepta el primero cuyo cuantil coverage del error
+    absoluto no supera tolerance; si ninguno lo consigue, se devuelve el mejor.
+    Devuelve (sistema, informe).
+    """
+    servicio_vals, comida_vals = input_grid(grid_step)
+    target = fuzzy_system.compute_batch(servicio_vals, comida_vals, method)
+    rules = len(fuzzy_system.rule_propina)
+
+    best = None
+    for order in orders:
+        for sharpness in sharpness_values:
+            matrix = design_matrix(fuzzy_system, servicio_vals, comida_vals, order, sharpness)
+            solution = np.linalg.lstsq(matrix, target, rcond=None)[0]
+            consequents = np.zeros((rules, 3))
+            consequents[:, :len(solution) // rules] = solution.reshape(-1, rules).T
+
+            sugeno = SugenoSystem(fuzzy_system, consequents, sharpness)
+            errors = np.abs(sugeno.compute_batch(servicio_vals, comida_vals) - target)
+            report = {
+                'order': order,
+                'sharpness': sharpness,
+                'quantile_error': float(np.quantile(errors, coverage)),
+                'max_abs_error': float(errors.max()),
+                'mean_abs_error': float(errors.mean()),
+                'within_tolerance': float(np.mean(errors <= tolerance)),
+            }
+            if best is None or report['quantile_error'] < best[1]['quantile_error']:
+                best = (sugeno, report)
+            if report['quantile_error'] <= tolerance:
+                return sugeno, dict(report, converged=True)
+    return best[0], dict(best[1], converged=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ajuste de un Sugeno que reproduce las propinas Mamdani")
+    parser.add_argument('--tolerance', type=float, default=1.0, help="error admitido en la propina")
+    parser.add_argument('--coverage', type=float, default=0.95, help="fracción de la rejilla que debe cumplirla")
+    parser.add_argument('--method', default='lom', choices=['lom', 'centroid'])
+    parser.add_argument('--grid-step', type=float, default=0.05, help="paso de la rejilla de ajuste")
+    parser.add_argument('--scalar-calls', type=int, default=500)
+    parser.add_argument('--json', help="ruta del informe JSON (incluye los consecuentes)")
+    args = parser.parse_args()
+
+    fuzzy_system = FuzzySystem()
+    sugeno, report = fit_sugeno(fuzzy_system, args.tolerance, args.coverage, args.method, args.grid_step)
+
+    rng = np.random.default_rng(0)
+    scalar_calls = [(float(s), float(c)) for s, c in rng.uniform(0, 5, (args.scalar_calls, 2))]
+    batch_calls = [input_grid(args.grid_step)]
+    mamdani_scalar = lambda s, c: fuzzy_system.defuzzify(fuzzy_system.infer(s, c), args.method)
+    mamdani_batch = lambda s, c: fuzzy_system.compute_batch(s, c, args.method)
+    report['timings'] = {
+        'mamdani': {'scalar_us': time_per_call(mamdani_scalar, scalar_calls) * 1e6,
+                    'batch_ms': time_per_call(mamdani_batch, batch_calls) * 1e3},
+        'sugeno': {'scalar_us': time_per_call(sugeno.compute, scalar_calls) * 1e6,
+                   'batch_ms': time_per_call(sugeno.compute_batch, batch_calls) * 1e3},
+    }
+    report.update(tolerance=args.tolerance, coverage=args.coverage, method=args.method,
+                  consequents=sugeno.consequents.tolist())
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    status = "cumple" if report['converged'] else "no cumple"
+    print(f"orden {report['order']}, sharpness={report['sharpness']}: {status} la tolerancia "
+          f"{args.tolerance} en el {args.coverage:.0%} de la rejilla")
+    print(f"error cuantil={report['quantile_error']:.3f} máximo={report['max_abs_error']:.3f} "
+          f"medio={report['mean_abs_error']:.3f} dentro={report['within_tolerance']:.1%}")
+    for name, timing in report['timings'].items():
+        print(f"{name:<8} escalar={timing['scalar_us']:8.1f} us lote={timing['batch_ms']:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""Barrido de parámetros de las funciones de membresía y análisis de sensibilidad.
+
+Cada --param da los valores de un punto de ruptura, como
+variable.término.índice=inicio:fin:paso (ambos extremos incluidos) o como una
+lista separada por comas. Se evalúa el producto cartesiano de todos los
+valores; las configuraciones con puntos de ruptura desordenados se descartan.
+Para cada configuración y método se calcula la superficie de propinas sobre la
+rejilla de entradas completa y se informa de:
+
+- la diferencia máxima y media frente a la superficie actual;
+- las violaciones de monotonía: bajadas de la propina al aumentar una entrada
+  en la que la tabla de reglas actual es creciente (o subidas si es
+  decreciente), con el número de la configuración actual como referencia.
+
+'lom' y 'som' se calculan con la defuzzificación exacta por lotes
+(consequent_strengths_batch + defuzzify_exact_batch, sin universo de salida).
+Difiere de la muestreada en menos de un paso del universo de propina.
+'centroid' usa compute_batch sobre el universo muestreado (--output-points).
+Las configuraciones se reparten entre procesos; cada uno reconstruye su
+FuzzySystem con rebuild_membership().
+
+Uso:
+    python sweep_membership.py --param propina.alta.1=11:13:0.25 --param propina.alta.2=13:14.5:0.25 \\
+        --methods lom,centroid --json barrido.json
+"""
+import argparse
+import copy
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bench_common import input_grid
+from fuzzy_system import FuzzySystem
+
+EXACT_METHODS = ('lom', 'som')
+SAMPLED_METHODS = ('centroid',)
+VARIABLES = ('servicio', 'comida', 'propina')
+
+_worker = None
+
+
+def parse_param(text):
+    """'propina.alta.2=13:14.5:0.5' -> (('propina', 'alta', 2), valores)"""
+    key, _, spec = text.partition('=')
+    try:
+        variable, term, index = key.split('.')
+        index = int(index)
+        if ':' in spec:
+            start, stop, step = (float(v) for v in spec.split(':'))
+            values = np.round(np.arange(start, stop + step / 2, step), 10)
+        else:
+            values = [float(v) for v in spec.split(',')]
+    except ValueError:
+        raise ValueError(f"Parámetro no válido: {text!r} (se espera variable.término.índice=inicio:fin:paso)")
+    if variable not in VARIABLES:
+        raise ValueError(f"Variable no válida: {variable}")
+    return (variable, term, index), [float(v) for v in values]
+
+
+def apply_overrides(base_shapes, overrides):
+    """Copia de los *_shapes con los puntos de ruptura cambiados; None si algún término queda desordenado"""
+    shapes = copy.deepcopy(base_shapes)
+    for (variable, term, index), value in overrides:
+        kind, params = shapes[variable][term]
+        if kind == 'singletonmf':
+            params = value
+        else:
+            params = list(params)
+            params[index] = value
+        shapes[variable][term] = (kind, params)
+    for variable_shapes in shapes.values():
+        if np.any(np.diff(FuzzySystem.trapezoid_params(variable_shapes), axis=1) < 0):
+            return None
+    return shapes
+
+
+def expected_directions(fuzzy_system):
+    """Sentido de la tabla de reglas en cada entrada: 1 creciente, -1 decreciente, 0 ninguno.
+
+    Cada celda (término de servicio, término de comida) toma el centro de la
+    meseta de su consecuente más alto, y los términos de cada entrada se ordenan
+    por el centro de su meseta.
+    """
+    params = [fuzzy_system.servicio_params, fuzzy_system.comida_params, fuzzy_system.propina_params]
+    centers = [(p[:, 1] + p[:, 2]) / 2 for p in params]
+    table = np.full((len(fuzzy_system.servicio_names), len(fuzzy_system.comida_names)), np.nan)
+    levels = centers[2][fuzzy_system.rule_propina]
+    np.fmax.at(table, (fuzzy_system.rule_servicio, fuzzy_system.rule_comida), levels)
+    table = table[np.argsort(centers[0])][:, np.argsort(centers[1])]
+
+    directions = []
+    for axis in (0, 1):
+        steps = np.diff(table, axis=axis)
+        steps = steps[~np.isnan(steps)]
+        directions.append(1 if np.all(steps >= 0) else -1 if np.all(steps <= 0) else 0)
+    return directions
+
+
+def monotonicity_violations(surface, directions, eps=1e-9):
+    """Número de pasos de la rejilla contra el sentido esperado y la mayor de esas diferencias"""
+    count = 0
+    worst = 0.0
+    for axis, direction in enumerate(directions):
+        if direction == 0:
+            continue
+        against = -direction * np.diff(surface, axis=axis)
+        count += int(np.count_nonzero(against > eps))
+        worst = max(worst, float(against.max(initial=0.0)))
+    return count, worst
+
+
+def tip_surfaces(fuzzy_system, servicio_vals, comida_vals, methods, strengths=None):
+    """Propinas de toda la rejilla para cada método.
+
+    strengths son las fuerzas por término ya calculadas para esas entradas, si
+    se tienen (solo dependen de los términos de servicio y comida).
+    """
+    surfaces = {}
+    exact = [m for m in methods if m in EXACT_METHODS]
+    if exact:
+        if strengths is None:
+            strengths = fuzzy_system.consequent_strengths_batch(servicio_vals, comida_vals)
+        for method in exact:
+            surfaces[method] = fuzzy_system.defuzzify_exact_batch(strengths, method)
+    for method in methods:
+        if method in SAMPLED_METHODS:
+            surfaces[method] = fuzzy_system.compute_batch(servicio_vals, comida_vals, method, chunk_size=1024)
+    return surfaces
+
+
+class SweepWorker:
+    """Estado de cada proceso: sistema base, rejilla y superficies de referencia"""
+
+    def __init__(self, input_points, output_points, grid_step, methods):
+        self.system = FuzzySystem(input_points, output_points)
+        self.base_shapes = {variable: getattr(self.system, f'{variable}_shapes') for variable in VARIABLES}
+        self.methods = methods
+        self.servicio_vals, self.comida_vals = input_grid(grid_step)
+        self.shape = (int(round(np.sqrt(len(self.servicio_vals)))),) * 2
+        self.directions = expected_directions(self.system)
+        self.baseline = tip_surfaces(self.system, self.servicio_vals, self.comida_vals, methods)
+        # Fuerzas de la última combinación de términos de entrada: al barrer solo
+        # la propina (o su último parámetro) se reutilizan entre configuraciones
+        self.strengths_key = None
+        self.strengths = None
+
+    def input_strengths(self, overrides):
+        key = tuple((k, v) for k, v in overrides if k[0] != 'propina')
+        if key != self.strengths_key:
+            self.strengths = self.system.consequent_strengths_batch(self.servicio_vals, self.comida_vals)
+            self.strengths_key = key
+        return self.strengths
+
+    def baseline_report(self):
+        return {method: dict(zip(('violations', 'worst_violation'),
+                                 monotonicity_violations(surface.reshape(self.shape), self.directions)))
+                for method, surface in self.baseline.items()}
+
+    def evaluate(self, overrides):
+        result = {'params': {'.'.join(map(str, key)): value for key, value in overrides}}
+        shapes = apply_overrides(self.base_shapes, overrides)
+        if shapes is None:
+            result['invalid'] = True
+            return result
+
+        for variable in VARIABLES:
+            setattr(self.system, f'{variable}_shapes', shapes[variable])
+        self.system.rebuild_membership()
+
+        strengths = self.input_strengths(overrides) if set(self.methods) & set(EXACT_METHODS) else None
+        surfaces = tip_surfaces(self.system, self.servicio_vals, self.comida_vals, self.methods, strengths)
+        for method, surface in surfaces.items():
+            diff = np.abs(surface - self.baseline[method])
+            violations, worst = monotonicity_violations(surface.reshape(self.shape), self.directions)
+            result[method] = {
+                'max_abs_diff': float(diff.max()),
+                'mean_abs_diff': float(diff.mean()),
+                'violations': violations,
+                'worst_violation': worst,
+            }
+        return result
+
+
+def _init_worker(*args):
+    global _worker
+    _worker = SweepWorker(*args)
+
+
+def _evaluate(overrides):
+    return _worker.evaluate(overrides)
+
+
+def run(args):
+    params = [parse_param(text) for text in args.param]
+    methods = args.methods.split(',')
+    for method in methods:
+        if method not in EXACT_METHODS + SAMPLED_METHODS:
+            raise ValueError(f"Método no soportado: {method}")
+    worker_args = (args.input_points, args.output_points, args.grid_step, methods)
+
+    keys = [key for key, _ in params]
+    configs = [list(zip(keys, values)) for values in itertools.product(*(values for _, values in params))]
+
+    reference = SweepWorker(*worker_args)
+    for variable, term, index in keys:
+        if term not in reference.base_shapes[variable]:
+            raise ValueError(f"Término no válido: {variable}.{term}")
+        kind, values = reference.base_shapes[variable][term]
+        size = 1 if kind == 'singletonmf' else len(values)
+        if not 0 <= index < size:
+            raise ValueError(f"{variable}.{term} solo tiene los índices 0-{size - 1}")
+    start = time.perf_counter()
+    workers = args.workers or os.cpu_count() or 1
+    chunksize = max(1, len(configs) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=worker_args) as executor:
+        results = list(executor.map(_evaluate, configs, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'methods': methods,
+        'grid_points': len(reference.servicio_vals),
+        'directions': dict(zip(('servicio', 'comida'), reference.directions)),
+        'baseline': reference.baseline_report(),
+        'configs': len(configs),
+        'invalid': sum(1 for r in results if r.get('invalid')),
+        'seconds': elapsed,
+        'configs_per_second': len(configs) / elapsed if elapsed else float('inf'),
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Barrido de puntos de ruptura de las funciones de membresía")
+    parser.add_argument('--param', action='append', required=True,
+                        help="variable.término.índice=inicio:fin:paso o lista con comas (repetible)")
+    parser.add_argument('--methods', default='lom', help="métodos separados por comas: lom, som, centroid")
+    parser.add_argument('--grid-step', type=float, default=0.01, help="paso de la rejilla de entradas")
+    parser.add_argument('--input-points', type=int, default=501)
+    parser.add_argument('--output-points', type=int, default=1501, help="puntos de propina (solo 'centroid')")
+    parser.add_argument('--workers', type=int, help="procesos (por defecto, uno por CPU)")
+    parser.add_argument('--top', type=int, default=10, help="configuraciones más sensibles a mostrar")
+    parser.add_argument('--json', help="ruta del informe JSON completo")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    valid = [r for r in report['results'] if not r.get('invalid')]
+    print(f"{report['configs']} configuraciones ({report['invalid']} descartadas) en {report['seconds']:.1f} s "
+          f"({report['configs_per_second']:.1f}/s), {report['grid_points']} entradas cada una")
+    for method in report['methods']:
+        baseline = report['baseline'][method]['violations']
+        worse = sum(1 for r in valid if r[method]['violations'] > baseline)
+        print(f"\n{method}: violaciones de monotonía actuales={baseline}, configuraciones que las aumentan={worse}")
+        for r in sorted(valid, key=lambda r: r[method]['mean_abs_diff'], reverse=True)[:args.top]:
+            stats = r[method]
+            params = ' '.join(f"{k}={v:g}" for k, v in r['params'].items())
+            print(f"  {params:<40} media={stats['mean_abs_diff']:.3f} máx={stats['max_abs_diff']:.3f} "
+                  f"violaciones={stats['violations']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Equivalencia de los caminos rápidos con la inferencia escalar en float64.
+
+La referencia es infer() en modo 'dense' (todas las reglas, float64) seguido de
+defuzzify() en cada nodo de la rejilla de 0.01: las 251001 entradas a las que
+PropinaApp y TipCache redondean.
+
+Uso: python -m pytest -q test_equivalence.py (tarda unos minutos)
+"""
+import numpy as np
+import pytest
+
+from fuzzy_system import FuzzySystem
+
+GRID = np.round(np.linspace(0, 5, 501), 2)
+METHODS = ('lom', 'centroid')
+
+
+def scalar_tips(fuzzy_system):
+    """Propinas de infer + defuzzify en cada nodo de la rejilla (501 x 501 por método)"""
+    tips = {method: np.empty((len(GRID), len(GRID))) for method in METHODS}
+    for i, servicio_val in enumerate(GRID):
+        for j, comida_val in enumerate(GRID):
+            aggregated = fuzzy_system.infer(servicio_val, comida_val)
+            for method in METHODS:
+                tips[method][i, j] = fuzzy_system.defuzzify(aggregated, method)
+    return tips
+
+
+@pytest.fixture(scope='module')
+def reference():
+    fuzzy_system = FuzzySystem()
+    fuzzy_system.inference_mode = 'dense'
+    return scalar_tips(fuzzy_system)
+
+
+@pytest.fixture(scope='module')
+def grid_inputs():
+    return np.meshgrid(GRID, GRID, indexing='ij')
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_lookup_table_nodes(reference, grid_inputs, method):
+    table = FuzzySystem().compile_table(method)
+    servicio_vals, comida_vals = grid_inputs
+    for lookup in ('nearest', 'bilinear'):
+        np.testing.assert_array_equal(table.lookup(servicio_vals, comida_vals, lookup), reference[method])
+
+
+@pytest.mark.parametrize('mode', ['sparse', 'fused'])
+def test_inference_modes(reference, mode):
+    fuzzy_system = FuzzySystem()
+    fuzzy_system.inference_mode = mode
+    tips = scalar_tips(fuzzy_system)
+    for method in METHODS:
+        np.testing.assert_array_equal(tips[method], reference[method])
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_batch(reference, grid_inputs, method):
+    servicio_vals, comida_vals = (v.ravel() for v in grid_inputs)
+    tips = FuzzySystem().compute_batch(servicio_vals, comida_vals, method, chunk_size=2048)
+    np.testing.assert_array_equal(tips.reshape(reference[method].shape), reference[method])
+
+
+def assert_compact_close(tips, reference, step):
+    # float32 en las funciones de propina: 'lom' puede moverse un paso del universo
+    np.testing.assert_allclose(tips['lom'], reference['lom'], rtol=0, atol=step * (1 + 1e-6))
+    np.testing.assert_allclose(tips['centroid'], reference['centroid'], rtol=0, atol=1e-8)
+
+
+@pytest.mark.parametrize('mode', ['sparse', 'dense', 'fused'])
+def test_compact_modes(reference, mode):
+    fuzzy_system = FuzzySystem(compact=True)
+    fuzzy_system.inference_mode = mode
+    step = fuzzy_system.propina_universe[1] - fuzzy_system.propina_universe[0]
+    assert_compact_close(scalar_tips(fuzzy_system), reference, step)
+
+
+def test_compact_batch(reference, grid_inputs):
+    fuzzy_system = FuzzySystem(compact=True)
+    servicio_vals, comida_vals = (v.ravel() for v in grid_inputs)
+    tips = {method: fuzzy_system.compute_batch(servicio_vals, comida_vals, method, chunk_size=2048)
+            .reshape(reference[method].shape) for method in METHODS}
+    step = fuzzy_system.propina_universe[1] - fuzzy_system.propina_universe[0]
+    assert_compact_close(tips, reference, step)
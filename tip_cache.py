@@ -0,0 +1,64 @@
+import collections
+import threading
+
+
+class TipCache:
+    """Caché LRU acotada de propinas, con las entradas cuantizadas.
+
+    La clave es (servicio, comida, método) redondeados a decimals; el valor se
+    calcula siempre sobre las entradas ya redondeadas para que un acierto
+    devuelva exactamente lo mismo que un cálculo nuevo. Quien cambie funciones
+    de membresía o reglas debe llamar a invalidate(). Un cálculo que estaba en
+    marcha al invalidar devuelve su propina pero no la guarda, porque puede
+    venir del modelo anterior.
+    """
+
+    def __init__(self, maxsize=65536, decimals=2):
+        self.maxsize = maxsize
+        self.decimals = decimals
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Aumenta en cada invalidate(); un resultado solo se guarda si no ha cambiado
+        self.generation = 0
+
+    def quantize(self, value):
+        return round(float(value), self.decimals)
+
+    def get_or_compute(self, servicio_val, comida_val, method, compute_fn):
+        """Devuelve la propina en caché o la calcula con compute_fn(servicio, comida)"""
+        servicio_val = self.quantize(servicio_val)
+        comida_val = self.quantize(comida_val)
+        key = (servicio_val, comida_val, method)
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            generation = self.generation
+
+        tip = compute_fn(servicio_val, comida_val)
+
+        with self._lock:
+            if generation != self.generation:
+                return tip
+            self._data[key] = tip
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return tip
+
+    def invalidate(self):
+        """Vacía la caché (p. ej. tras cambiar funciones de membresía o reglas)"""
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self._data), 'maxsize': self.maxsize}
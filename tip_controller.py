@@ -0,0 +1,279 @@
+import contextlib
+import queue
+import threading
+import warnings
+import numpy as np
+import membership
+from lookup_table import TipLookupTable
+from tip_cache import TipCache
+
+def build_control_system(input_points=501, output_points=1501, defuzz_method='lom'):
+    """Construye variables, términos y reglas del controlador de propinas.
+
+    defuzz_method es el método de defuzzificación de la propina ('centroid',
+    'bisector', 'mom', 'som' o 'lom'): skfuzzy lo lee del Consequent, no de la
+    simulación. skfuzzy guarda el estado de cada simulación en los propios términos, así que
+    las simulaciones que se usan a la vez necesitan cada una su ControlSystem.
+    """
+    # skfuzzy importa matplotlib: se carga solo al construir el primer sistema
+    from skfuzzy import control as ctrl
+
+    # Configuración de rangos de alta precisión
+    servicio = ctrl.Antecedent(np.linspace(0, 5, input_points), 'servicio')
+    comida = ctrl.Antecedent(np.linspace(0, 5, input_points), 'comida')
+    propina = ctrl.Consequent(np.linspace(0, 15, output_points), 'propina', defuzzify_method=defuzz_method)
+
+    # Funciones de membresía para servicio (membership: singletons exactos, sin dividir por cero)
+    servicio['inexistente'] = membership.trimf(servicio.universe, [0, 0, 0.001])
+    servicio['mediocre'] = membership.trapmf(servicio.universe, [0.001, 0.1, 1, 1.5])
+    servicio['mala'] = membership.trimf(servicio.universe, [0.5, 1.5, 2.5])
+    servicio['regular'] = membership.trimf(servicio.universe, [1.5, 2.5, 3.5])
+    servicio['bueno'] = membership.trimf(servicio.universe, [2.5, 3.5, 4.5])
+    servicio['excelente'] = membership.trapmf(servicio.universe, [3.5, 4.5, 5, 5])
+
+    # Funciones de membresía para comida
+    comida['inexistente'] = membership.trimf(comida.universe, [0, 0, 0.001])
+    comida['mediocre'] = membership.trapmf(comida.universe, [0.001, 0.1, 1, 1.5])
+    comida['mala'] = membership.trimf(comida.universe, [0.5, 1.5, 2.5])
+    comida['regular'] = membership.trimf(comida.universe, [1.5, 2.5, 3.5])
+    comida['bueno'] = membership.trimf(comida.universe, [2.5, 3.5, 4.5])
+    comida['excelente'] = membership.trapmf(comida.universe, [3.5, 4.5, 5, 5])
+
+    # Configuración manual de las membresías de propina
+    propina['muyalta'] = membership.trimf(propina.universe, [15, 15, 15])
+    propina['alta'] = membership.trapmf(propina.universe, [10, 12, 14, 14.99])
+    propina['media'] = membership.trapmf(propina.universe, [6, 8, 10, 12])
+    propina['baja'] = membership.trapmf(propina.universe, [2, 4, 6, 8])
+    propina['muybaja'] = membership.trimf(propina.universe, [0, 0, 0])
+
+    # Reglas del sistema (igual que antes)
+    rules = [
+        ctrl.Rule(servicio['inexistente'] & comida['inexistente'], propina['muybaja']),
+        ctrl.Rule(servicio['inexistente'] & comida['mediocre'], propina['muybaja']),
+        ctrl.Rule(servicio['inexistente'] & comida['mala'], propina['muybaja']),
+        ctrl.Rule(servicio['inexistente'] & comida['regular'], propina['muybaja']),
+        ctrl.Rule(servicio['inexistente'] & comida['bueno'], propina['muybaja']),
+        ctrl.Rule(servicio['inexistente'] & comida['excelente'], propina['muybaja']),
+
+        ctrl.Rule(servicio['mediocre'] & comida['inexistente'], propina['muybaja']),
+        ctrl.Rule(servicio['mala'] & comida['inexistente'], propina['muybaja']),
+        ctrl.Rule(servicio['regular'] & comida['inexistente'], propina['muybaja']),
+        ctrl.Rule(servicio['bueno'] & comida['inexistente'], propina['muybaja']),
+        ctrl.Rule(servicio['excelente'] & comida['inexistente'], propina['muybaja']),
+
+        ctrl.Rule(servicio['mediocre'] & comida['mediocre'], propina['baja']),
+        ctrl.Rule(servicio['mediocre'] & comida['mala'], propina['baja']),
+        ctrl.Rule(servicio['mediocre'] & comida['regular'], propina['baja']),
+        ctrl.Rule(servicio['mediocre'] & comida['bueno'], propina['media']),
+        ctrl.Rule(servicio['mediocre'] & comida['excelente'], propina['media']),
+
+        ctrl.Rule(servicio['mala'] & comida['mediocre'], propina['baja']),
+        ctrl.Rule(servicio['mala'] & comida['mala'], propina['baja']),
+        ctrl.Rule(servicio['mala'] & comida['regular'], propina['media']),
+        ctrl.Rule(servicio['mala'] & comida['bueno'], propina['media']),
+        ctrl.Rule(servicio['mala'] & comida['excelente'], propina['media']),
+
+        ctrl.Rule(servicio['regular'] & comida['mediocre'], propina['media']),
+        ctrl.Rule(servicio['regular'] & comida['mala'], propina['media']),
+        ctrl.Rule(servicio['regular'] & comida['regular'], propina['media']),
+        ctrl.Rule(servicio['regular'] & comida['bueno'], propina['alta']),
+        ctrl.Rule(servicio['regular'] & comida['excelente'], propina['alta']),
+
+        ctrl.Rule(servicio['bueno'] & comida['mediocre'], propina['media']),
+        ctrl.Rule(servicio['bueno'] & comida['mala'], propina['media']),
+        ctrl.Rule(servicio['bueno'] & comida['regular'], propina['alta']),
+        ctrl.Rule(servicio['bueno'] & comida['bueno'], propina['alta']),
+        ctrl.Rule(servicio['bueno'] & comida['excelente'], propina['muyalta']),
+
+        ctrl.Rule(servicio['excelente'] & comida['mediocre'], propina['alta']),
+        ctrl.Rule(servicio['excelente'] & comida['mala'], propina['alta']),
+        ctrl.Rule(servicio['excelente'] & comida['regular'], propina['muyalta']),
+        ctrl.Rule(servicio['excelente'] & comida['bueno'], propina['muyalta']),
+        ctrl.Rule(servicio['excelente'] & comida['excelente'], propina['muyalta']),
+    ]
+
+    return ctrl.ControlSystem(rules)
+
+# Controlador por defecto (sistema_propina, servicio, comida, propina y
+# calculador_propina), construido la primera vez que se accede a él
+_default_controller = {}
+_default_lock = threading.Lock()
+
+def _build_default_controller():
+    from skfuzzy import control as ctrl
+
+    with _default_lock:
+        if not _default_controller:
+            sistema_propina = build_control_system()
+            variables = {variable.label: variable
+                         for variable in (*sistema_propina.antecedents, *sistema_propina.consequents)}
+            calculador_propina = ctrl.ControlSystemSimulation(sistema_propina)
+            _default_controller.update(variables, sistema_propina=sistema_propina,
+                                       calculador_propina=calculador_propina)
+    return _default_controller
+
+def __getattr__(name):
+    if name in ('sistema_propina', 'servicio', 'comida', 'propina', 'calculador_propina'):
+        return _build_default_controller()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class SimulationPool:
+    """Reserva acotada de ControlSystemSimulation para llamadas desde varios hilos.
+
+    Cada simulación tiene su propio ControlSystem y la usa un solo hilo a la vez;
+    se crean bajo demanda hasta size y, a partir de ahí, los hilos esperan a que
+    se devuelva alguna.
+    """
+
+    def __init__(self, system_factory=build_control_system, size=8, defuzz_method='lom'):
+        self.system_factory = system_factory
+        self.size = size
+        self.defuzz_method = defuzz_method
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        # Avisa a los hilos en espera cuando se devuelve una simulación o falla una creación
+        self._available = threading.Condition(self._lock)
+        # Funciones que reciben cada simulación nueva (p. ej. StageProfiler.instrument_simulation)
+        self.simulation_hooks = []
+
+    def reset(self, system_factory):
+        """Descarta las simulaciones actuales; las nuevas usarán system_factory"""
+        with self._lock:
+            self.system_factory = system_factory
+            self._created = 0
+            self._idle = queue.LifoQueue()
+            self._available.notify_all()
+
+    def _new_simulation(self):
+        from skfuzzy import control as ctrl
+
+        simulacion = ctrl.ControlSystemSimulation(self.system_factory())
+        # Cada simulación tiene su propio ControlSystem: el método se fija en sus consecuentes
+        for consequent in simulacion.ctrl.consequents:
+            consequent.defuzzify_method = self.defuzz_method
+        for hook in self.simulation_hooks:
+            hook(simulacion)
+        return simulacion
+
+    def idle_simulations(self):
+        """Simulaciones creadas que no están prestadas en este momento"""
+        with self._idle.mutex:
+            return list(self._idle.queue)
+
+    @contextlib.contextmanager
+    def simulation(self):
+        """Presta una simulación y la devuelve al salir del bloque with"""
+        with self._available:
+            while True:
+                idle = self._idle
+                if not idle.empty():
+                    simulacion = idle.get_nowait()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    simulacion = None
+                    break
+                self._available.wait()
+        if simulacion is None:
+            try:
+                simulacion = self._new_simulation()
+            except BaseException:
+                # Libera el hueco: si no, tras size fallos los hilos esperarían para siempre
+                with self._available:
+                    if self._idle is idle:
+                        self._created -= 1
+                    self._available.notify()
+                raise
+        try:
+            yield simulacion
+        finally:
+            # Vuelve a su propia reserva: tras reset() la anterior queda sin uso
+            with self._available:
+                idle.put(simulacion)
+                self._available.notify()
+
+    def compute(self, servicio_val, comida_val):
+        """Propina bruta de skfuzzy para un par de entradas"""
+        with self.simulation() as simulacion:
+            simulacion.input['servicio'] = servicio_val
+            simulacion.input['comida'] = comida_val
+            simulacion.compute()
+            return simulacion.output['propina']
+
+    def compute_explained(self, servicio_val, comida_val):
+        """Propina bruta y corte de cada término de propina con una sola simulación"""
+        with self.simulation() as simulacion:
+            simulacion.input['servicio'] = servicio_val
+            simulacion.input['comida'] = comida_val
+            simulacion.compute()
+            # El estado queda en los términos del ControlSystem de esta simulación
+            propina = next(c for c in simulacion.ctrl.consequents if c.label == 'propina')
+            strengths = np.array([term.membership_value[simulacion] or 0.0 for term in propina.terms.values()])
+            return simulacion.output['propina'], strengths
+
+    def consequent_strengths(self, servicio_val, comida_val):
+        """Corte de cada término de propina (0 si ninguna regla lo activa)"""
+        return self.compute_explained(servicio_val, comida_val)[1]
+
+# La ventana de proyectoLD siempre ha mostrado el centroide (el 'lom' que se fijaba en
+# la simulación no tenía efecto), así que la reserva de compute_tip lo conserva
+simulation_pool = SimulationPool(defuzz_method='centroid')
+# Reserva aparte: una simulación que recibe arrays ya no acepta entradas escalares
+array_simulation_pool = SimulationPool(size=2)
+
+tip_cache = TipCache()
+
+def _compute_tip_uncached(servicio_val, comida_val):
+    # Caso especial [0,0]
+    if servicio_val == 0 and comida_val == 0:
+        return 0.0
+    return max(0.0, min(simulation_pool.compute(servicio_val, comida_val), 15.0))
+
+def compute_tip(servicio_val, comida_val):
+    """Calcula la propina de forma segura entre hilos (0 para [0,0], limitada a 0-15).
+
+    Usa el método de simulation_pool ('centroid'). Las entradas se redondean a 2
+    decimales y el resultado se guarda en tip_cache.
+    """
+    return tip_cache.get_or_compute(servicio_val, comida_val, simulation_pool.defuzz_method,
+                                    _compute_tip_uncached)
+
+def _compute_tip_explained_uncached(servicio_val, comida_val):
+    tip, strengths = simulation_pool.compute_explained(servicio_val, comida_val)
+    # Caso especial [0,0]
+    if servicio_val == 0 and comida_val == 0:
+        return 0.0, strengths
+    return max(0.0, min(tip, 15.0)), strengths
+
+def compute_tip_explained(servicio_val, comida_val):
+    """compute_tip más el corte de cada término de propina, con un solo cálculo de skfuzzy (en caché)"""
+    return tip_cache.get_or_compute(servicio_val, comida_val, simulation_pool.defuzz_method + '_explain',
+                                    _compute_tip_explained_uncached)
+
+def reload_controller(system_factory=build_control_system):
+    """Cambia las funciones de membresía o reglas del controlador y vacía la caché"""
+    simulation_pool.reset(system_factory)
+    array_simulation_pool.reset(system_factory)
+    tip_cache.invalidate()
+
+def compute_tip_array(servicio_vals, comida_vals):
+    """Calcula la propina para arrays de entradas en una sola simulación"""
+    servicio_vals = np.asarray(servicio_vals, dtype=float)
+    comida_vals = np.asarray(comida_vals, dtype=float)
+    with array_simulation_pool.simulation() as simulacion, warnings.catch_warnings():
+        # Se reemplazan ambas entradas, así que el aviso por cambio de tamaño no aplica
+        warnings.filterwarnings('ignore', message="Input array is shape")
+        simulacion.input['servicio'] = servicio_vals
+        simulacion.input['comida'] = comida_vals
+        simulacion.compute()
+        tips = np.clip(simulacion.output['propina'], 0, 15)
+    # Caso especial [0,0]
+    return np.where((servicio_vals == 0) & (comida_vals == 0), 0.0, tips)
+
+def compile_tip_table(resolution=501, chunk_size=2048):
+    """Precalcula la tabla de propinas del controlador skfuzzy (tarda minutos a 501x501)"""
+    return TipLookupTable.compile(compute_tip_array,
+                                  np.linspace(0, 5, resolution),
+                                  np.linspace(0, 5, resolution),
+                                  chunk_size=chunk_size)
@@ -0,0 +1,233 @@
+"""Servidor de propinas sin interfaz gráfica (JSON por líneas sobre TCP).
+
+Cada línea recibida es una petición JSON y cada respuesta es otra línea JSON:
+
+    {"id": 1, "servicio": 3.5, "comida": 4, "engine": "fuzzy", "method": "lom"}
+    {"id": 1, "propina": 12.0}
+
+    {"cmd": "stats"}
+    {"requests": 1, "p50_ms": ..., "p90_ms": ..., "p99_ms": ..., "batches": 1, ...}
+
+    {"cmd": "profile"}                          (solo con --profile)
+    {"fuzzify": {"count": ..., "mean_us": ..., "buckets": {...}}, ...}
+    {"cmd": "profile", "format": "prometheus"}
+    {"text": "# TYPE fuzzy_stage_seconds histogram\n..."}
+
+Las peticiones concurrentes se agrupan en micro-lotes y se resuelven con una sola
+llamada vectorizada. El motor 'fuzzy' (FuzzySystem) no importa tkinter, matplotlib
+ni PIL; el motor 'skfuzzy' (tip_controller) se carga solo cuando se pide, porque
+skfuzzy importa matplotlib por su cuenta.
+
+Uso: python tip_server.py --port 8765
+"""
+import argparse
+import asyncio
+import collections
+import json
+import math
+import time
+
+import numpy as np
+
+from fuzzy_system import DEFUZZ_METHODS, FuzzySystem
+from profiling import StageProfiler
+
+# Métodos admitidos por cada motor; se comprueban antes de crear un micro-lote
+ENGINE_METHODS = {
+    'fuzzy': DEFUZZ_METHODS,
+    'skfuzzy': ('lom',),
+}
+
+
+class LatencyStats:
+    """Latencias de las últimas peticiones y tamaños de lote"""
+
+    def __init__(self, window=10000):
+        self.latencies = collections.deque(maxlen=window)
+        self.requests = 0
+        self.batches = 0
+        self.batched_requests = 0
+
+    def record_request(self, seconds):
+        self.latencies.append(seconds)
+        self.requests += 1
+
+    def record_batch(self, size):
+        self.batches += 1
+        self.batched_requests += size
+
+    def snapshot(self):
+        result = {'requests': self.requests, 'batches': self.batches,
+                  'mean_batch_size': self.batched_requests / self.batches if self.batches else 0.0}
+        if self.latencies:
+            p50, p90, p99 = np.percentile(np.array(self.latencies) * 1000, [50, 90, 99])
+            result.update(p50_ms=float(p50), p90_ms=float(p90), p99_ms=float(p99))
+        return result
+
+
+class MicroBatcher:
+    """Agrupa peticiones concurrentes y las resuelve con una función vectorizada.
+
+    batch_fn(servicios, comidas) -> propinas se ejecuta en un hilo aparte para
+    no bloquear el bucle de eventos. Un lote se despacha al llegar a max_batch
+    peticiones o al pasar max_delay segundos desde la primera.
+    """
+
+    def __init__(self, batch_fn, stats, max_batch=256, max_delay=0.002):
+        self.batch_fn = batch_fn
+        self.stats = stats
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = asyncio.Queue()
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def submit(self, servicio_val, comida_val):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((servicio_val, comida_val, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            servicio_vals = np.array([item[0] for item in batch], dtype=float)
+            comida_vals = np.array([item[1] for item in batch], dtype=float)
+            try:
+                tips = await loop.run_in_executor(None, self.batch_fn, servicio_vals, comida_vals)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.stats.record_batch(len(batch))
+            for (_, _, future), tip in zip(batch, tips):
+                if not future.done():
+                    future.set_result(float(tip))
+
+
+class TipServer:
+    """Servidor asyncio que atiende peticiones de propina por micro-lotes"""
+
+    def __init__(self, max_batch=256, max_delay=0.002, profile=False):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.stats = LatencyStats()
+        self.fuzzy_system = FuzzySystem()
+        self.batchers = {}
+        # Tiempos por etapa de los motores (solo si se piden: sin profiler no hay coste)
+        self.profiler = StageProfiler() if profile else None
+        if self.profiler:
+            self.profiler.instrument_fuzzy_system(self.fuzzy_system)
+
+    def batch_function(self, engine, method):
+        """Función vectorizada para cada motor"""
+        if engine == 'fuzzy':
+            return lambda s, c: self.fuzzy_system.compute_batch(s, c, method)
+        import tip_controller
+        if self.profiler:
+            self.profiler.instrument_pool(tip_controller.array_simulation_pool)
+        return tip_controller.compute_tip_array
+
+    def get_batcher(self, engine, method):
+        # Se valida antes de crear nada: la clave la elige el cliente
+        if engine not in ENGINE_METHODS:
+            raise ValueError(f"Motor no soportado: {engine}")
+        if method not in ENGINE_METHODS[engine]:
+            raise ValueError(f"El motor {engine} solo admite los métodos {', '.join(ENGINE_METHODS[engine])}")
+        key = (engine, method)
+        if key not in self.batchers:
+            batcher = MicroBatcher(self.batch_function(engine, method), self.stats,
+                                   self.max_batch, self.max_delay)
+            batcher.start()
+            self.batchers[key] = batcher
+        return self.batchers[key]
+
+    async def handle_request(self, request):
+        if request.get('cmd') == 'stats':
+            return self.stats.snapshot()
+        if request.get('cmd') == 'profile':
+            if self.profiler is None:
+                raise ValueError("El servidor no se inició con --profile")
+            if request.get('format') == 'prometheus':
+                return {'text': self.profiler.to_prometheus()}
+            return self.profiler.snapshot()
+
+        start = time.perf_counter()
+        servicio_val = float(request['servicio'])
+        comida_val = float(request['comida'])
+        if not (math.isfinite(servicio_val) and math.isfinite(comida_val)):
+            raise ValueError("servicio y comida deben ser números finitos")
+        batcher = self.get_batcher(request.get('engine', 'fuzzy'), request.get('method', 'lom'))
+        tip = await batcher.submit(servicio_val, comida_val)
+        self.stats.record_request(time.perf_counter() - start)
+
+        response = {'propina': tip}
+        if 'id' in request:
+            response['id'] = request['id']
+        return response
+
+    async def respond(self, line, writer, lock):
+        try:
+            response = await self.handle_request(json.loads(line))
+        except KeyError as e:
+            response = {'error': f"Falta el campo {e}"}
+        except Exception as e:
+            response = {'error': str(e)}
+        async with lock:
+            writer.write((json.dumps(response) + '\n').encode())
+            await writer.drain()
+
+    async def handle_client(self, reader, writer):
+        # Cada línea se atiende en su propia tarea para poder agruparlas en lotes
+        lock = asyncio.Lock()
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self.respond(line, writer, lock))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de propinas difusas sin interfaz gráfica")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--max-delay', type=float, default=0.002, help="espera máxima para llenar un lote (s)")
+    parser.add_argument('--profile', action='store_true', help="mide los tiempos por etapa ({\"cmd\": \"profile\"})")
+    args = parser.parse_args()
+
+    server = TipServer(args.max_batch, args.max_delay, args.profile)
+    asyncio.run(server.serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()